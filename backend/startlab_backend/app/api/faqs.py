@@ -1,58 +1,120 @@
-from fastapi import APIRouter, HTTPException
-from ..crud.crud import get_faqs, get_faq
-import os
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+from ..crud.crud import get_faqs, get_faq, get_faqs_columns, get_faqs_by_ids, search_faqs
+from ..schemas.rows import media_url, faq_rows
+from ..utils.batch import parse_ids, order_by_ids
+from ..utils.fields import parse_fields, columns_for, project
+from ..utils.http_cache import get_representation, conditional_response, make_representation
 
 router = APIRouter(prefix="/faqs", tags=["faqs"])
 
-def get_image_url(image_path: str) -> str:
-    """Преобразует путь к изображению в полный URL"""
-    if not image_path:
-        return None
-    
-    # Если это уже полный URL, возвращаем как есть
-    if image_path.startswith('http'):
-        return image_path
-    
-    # Иначе добавляем базовый URL
-    base_url = os.getenv("MEDIA_BASE_URL", "http://bsuir.stacklevel.group/media/")
-    return f"{base_url}{image_path}"
+# Поля, доступные через ?fields=, и колонки вычисляемых полей
+FAQ_FIELDS = ("id", "question", "answer", "order", "image", "imageUrl", "is_active", "created_at")
+FAQ_DERIVED_FIELDS = {"imageUrl": ("image",)}
+SEARCH_LIMIT_MAX = 50
+
+async def faqs_payload():
+    """FAQ в форме ответа GET /faqs/ (используется и публикатором снимков)"""
+    faqs = await get_faqs()
+    print(f"✅ Получено {len(faqs)} FAQ из базы данных")
+    return faq_rows(faqs)
+
+async def faqs_fields_payload(fields: tuple):
+    """FAQ только с полями fields; из БД читаются только нужные колонки"""
+    rows = await get_faqs_columns(columns_for(fields, FAQ_DERIVED_FIELDS))
+    faqs = []
+    for row in rows:
+        if 'imageUrl' in fields:
+            row = {**row, 'imageUrl': media_url(row.get('image'))}
+        faqs.append(project(row, fields))
+    return faqs
+
+async def faqs_ids_payload(ids: tuple, fields=None):
+    """FAQ по списку id одним запросом: {"items": [...] в порядке ids, "missing": [...]}"""
+    rows = await get_faqs_by_ids(ids, columns_for(fields, FAQ_DERIVED_FIELDS) if fields else None)
+    items, missing = order_by_ids(rows, ids)
+    if fields is None:
+        return {"items": faq_rows(items), "missing": missing}
+    if 'imageUrl' in fields:
+        items = [{**faq, 'imageUrl': media_url(faq.get('image'))} for faq in items]
+    return {"items": [project(faq, fields) for faq in items], "missing": missing}
 
 @router.get("/")
-async def get_faqs_endpoint():
-    """Получить все FAQ"""
+async def get_faqs_endpoint(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,question"),
+    ids: Optional[str] = Query(None, description="id через запятую: несколько FAQ одним запросом"),
+):
+    """
+    Получить все FAQ (с ?fields= — только указанные поля).
+    С ids — {"items": [...], "missing": [...]} в порядке ids
+    """
+    selected = None
+    if fields is not None:
+        try:
+            selected = parse_fields(fields, FAQ_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if ids is not None:
+        try:
+            requested = parse_ids(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            # Без кэша контента, как в news.py
+            batch = await faqs_ids_payload(requested, selected)
+            return conditional_response(request, make_representation(batch, "faqs"))
+        except Exception as e:
+            print(f"❌ Ошибка при получении FAQ по id: {e}")
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if selected is not None:
+        build = lambda: faqs_fields_payload(selected)
+        key = ("faqs", "response", "fields", selected)
+    else:
+        build = faqs_payload
+        key = ("faqs", "response")
+
     try:
-        faqs = get_faqs()
-        print(f"✅ Получено {len(faqs)} FAQ из базы данных")
-        
-        # Преобразуем пути к изображениям в полные URL
-        for faq in faqs:
-            if faq.get('image'):
-                faq['imageUrl'] = get_image_url(faq['image'])
-            else:
-                faq['imageUrl'] = None
-        
-        return faqs
+        representation = await get_representation(key, build)
+        return conditional_response(request, representation)
     except Exception as e:
         print(f"❌ Ошибка при получении FAQ: {e}")
         import traceback
         print(f"🔍 Полный traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+# Объявлен до /{faq_id}, иначе "search" попадет в faq_id
+@router.get("/search")
+async def search_faqs_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос (синтаксис websearch)"),
+    limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+):
+    """Полнотекстовый поиск по FAQ: по релевантности, snippet ответа с <mark> вокруг совпадений"""
+    try:
+        results = await search_faqs(q.strip(), limit)
+        for faq in results:
+            faq['imageUrl'] = media_url(faq['image'])
+        # Запросы почти не повторяются — в кэш контента не кладем, ETag все равно работает
+        return conditional_response(request, make_representation(results, "faqs"))
+    except Exception as e:
+        print(f"❌ Ошибка при поиске FAQ: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @router.get("/{faq_id}")
-async def get_faq_endpoint(faq_id: int):
+async def get_faq_endpoint(faq_id: int, request: Request):
     """Получить FAQ по ID"""
-    try:
-        faq = get_faq(faq_id)
+    async def build():
+        faq = await get_faq(faq_id)
         if not faq:
             raise HTTPException(status_code=404, detail="FAQ not found")
-        
-        # Преобразуем путь к изображению в полный URL
-        if faq.get('image'):
-            faq['imageUrl'] = get_image_url(faq['image'])
-        else:
-            faq['imageUrl'] = None
-            
-        return faq
+        return faq_rows([faq])[0]
+
+    try:
+        representation = await get_representation(("faqs", "response", faq_id), build)
+        return conditional_response(request, representation)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+
+from .faqs import faqs_payload
+from .news import news_page_payload
+from .partners import partners_payload
+from ..config.async_database import execute_single_query
+from ..utils.cache import register_dependent
+from ..utils.http_cache import get_representation, conditional_response
+
+router = APIRouter(tags=["home"])
+
+HOME_NEWS_LIMIT = int(os.getenv("HOME_NEWS_LIMIT", "4"))
+
+# Главная кэшируется одним блоком и сбрасывается при изменении любого источника
+register_dependent("home", "partners", "faqs", "news")
+
+# Есть ли в источниках активные строки: подтверждает, что пустой раздел действительно пуст
+SECTIONS_EXIST = """
+    SELECT
+        EXISTS (SELECT 1 FROM partners WHERE is_active = true) AS partners,
+        EXISTS (SELECT 1 FROM faqs WHERE is_active = true) AS faqs,
+        EXISTS (SELECT 1 FROM news WHERE is_active = true) AS news
+"""
+
+async def home_payload():
+    """Данные главной страницы: партнеры, FAQ и последние новости (без content)"""
+    # Запросы идут параллельно на разных соединениях асинхронного пула
+    partners, faqs, news = await asyncio.gather(
+        partners_payload(),
+        faqs_payload(),
+        news_page_payload(HOME_NEWS_LIMIT),
+    )
+    return {"partners": partners, "faqs": faqs, "news": news["items"]}
+
+async def _empty_sections_confirmed(home):
+    """
+    CRUD превращает ошибку БД в пустой список: пустой раздел кэшируется,
+    только если отдельный запрос (ошибки не глушит) подтвердил, что строк нет
+    """
+    empty = [section for section, items in home.items() if not items]
+    if not empty:
+        return True
+    try:
+        exists = await execute_single_query(SECTIONS_EXIST)
+    except Exception as e:
+        print(f"❌ Главная: не удалось проверить пустые разделы {empty}: {e}")
+        return False
+    return not any(exists[section] for section in empty)
+
+async def home_representation():
+    """Представление /home (используется и публикатором снимков)"""
+    failed = False
+
+    async def build():
+        nonlocal failed
+        home = await home_payload()
+        failed = not await _empty_sections_confirmed(home)
+        return home
+
+    # Не кэшируется только неудачная сборка; законно пустые разделы — кэшируются
+    return await get_representation(("home", "response"), build, is_empty=lambda home: failed)
+
+@router.get("/home")
+async def get_home_endpoint(request: Request):
+    """Получить все данные главной страницы одним запросом"""
+    try:
+        representation = await home_representation()
+        return conditional_response(request, representation)
+    except Exception as e:
+        print(f"❌ Ошибка при получении данных главной страницы: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -1,58 +1,168 @@
-from fastapi import APIRouter, HTTPException
-from ..crud.crud import get_news, get_news_item
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+from ..crud.crud import get_news, get_news_item, get_news_page, get_news_columns, get_news_by_ids, search_news
+from ..schemas.rows import media_url, news_rows, news_page_rows
+from ..utils.batch import parse_ids, order_by_ids
+from ..utils.fields import parse_fields, columns_for, project
+from ..utils.http_cache import get_representation, conditional_response, make_representation
+from ..utils.pagination import encode_cursor, decode_cursor
 import os
 
 router = APIRouter(prefix="/news", tags=["news"])
 
-def get_image_url(image_path: str) -> str:
-    """Преобразует путь к изображению в полный URL"""
-    if not image_path:
-        return None
-    
-    # Если это уже полный URL, возвращаем как есть
-    if image_path.startswith('http'):
-        return image_path
-    
-    # Иначе добавляем базовый URL
-    base_url = os.getenv("MEDIA_BASE_URL", "http://bsuir.stacklevel.group/media/")
-    return f"{base_url}{image_path}"
+NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", "12"))
+NEWS_PAGE_MAX = 100
+SEARCH_LIMIT_MAX = 50
+
+# Поля, доступные через ?fields= (для списка и для страниц), и колонки вычисляемых полей
+NEWS_FIELDS = ("id", "title", "content", "image", "imageUrl", "is_active", "created_at", "updated_at")
+NEWS_PAGE_FIELDS = ("id", "title", "excerpt", "image", "imageUrl", "is_active", "created_at", "updated_at")
+NEWS_DERIVED_FIELDS = {"imageUrl": ("image",)}
+
+async def news_payload():
+    """Новости в форме ответа GET /news/ (используется и публикатором снимков)"""
+    news = await get_news()
+    print(f"✅ Получено {len(news)} новостей из базы данных")
+    return news_rows(news)
+
+async def news_fields_payload(fields: tuple):
+    """Новости только с полями fields; из БД читаются только нужные колонки"""
+    rows = await get_news_columns(columns_for(fields, NEWS_DERIVED_FIELDS))
+    news = []
+    for row in rows:
+        if 'imageUrl' in fields:
+            row = {**row, 'imageUrl': media_url(row.get('image'))}
+        news.append(project(row, fields))
+    return news
+
+async def news_ids_payload(ids: tuple, fields=None):
+    """Новости по списку id одним запросом: {"items": [...] в порядке ids, "missing": [...]}"""
+    rows = await get_news_by_ids(ids, columns_for(fields, NEWS_DERIVED_FIELDS) if fields else None)
+    items, missing = order_by_ids(rows, ids)
+    if fields is None:
+        return {"items": news_rows(items), "missing": missing}
+    if 'imageUrl' in fields:
+        items = [{**item, 'imageUrl': media_url(item.get('image'))} for item in items]
+    return {"items": [project(item, fields) for item in items], "missing": missing}
+
+async def news_page_payload(limit: int, after_created_at=None, after_id=None, fields=None):
+    """Страница новостей без content: {"items": [...], "next_cursor": str | None}"""
+    rows = await get_news_page(limit, after_created_at, after_id)
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1]['created_at'], page[-1]['id'])
+    if fields is None:
+        return {"items": news_page_rows(page), "next_cursor": next_cursor}
+    items = [project({**row, 'imageUrl': media_url(row['image'])}, fields) for row in page]
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/")
-async def get_news_endpoint():
-    """Получить все новости"""
+async def get_news_endpoint(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=NEWS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,title,imageUrl"),
+    ids: Optional[str] = Query(None, description="id через запятую: несколько новостей одним запросом"),
+):
+    """
+    Получить все новости.
+    С limit и/или cursor — страница без content (title, image, excerpt, даты)
+    и next_cursor для следующей страницы; полный текст — в /news/{id}.
+    С ids — {"items": [...], "missing": [...]} в порядке ids.
+    С fields — только указанные поля
+    """
+    paged = limit is not None or cursor is not None
+    if ids is not None and paged:
+        raise HTTPException(status_code=400, detail="ids cannot be combined with limit/cursor")
+    selected = None
+    if fields is not None:
+        try:
+            selected = parse_fields(fields, NEWS_PAGE_FIELDS if paged else NEWS_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if ids is not None:
+        try:
+            requested = parse_ids(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            # Наборы id задает клиент: в кэш контента не кладем, чтобы они не вытесняли
+            # списки и объекты; один запрос ANY(), ETag работает
+            batch = await news_ids_payload(requested, selected)
+            return conditional_response(request, make_representation(batch, "news"))
+        except Exception as e:
+            print(f"❌ Ошибка при получении новостей по id: {e}")
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if paged:
+        try:
+            after_created_at, after_id = decode_cursor(cursor) if cursor else (None, None)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        limit = limit or NEWS_PAGE_SIZE
+        try:
+            representation = await get_representation(
+                ("news", "response", "page", limit, cursor, selected),
+                lambda: news_page_payload(limit, after_created_at, after_id, selected),
+                is_empty=lambda page: not page["items"],
+            )
+            return conditional_response(request, representation)
+        except Exception as e:
+            print(f"❌ Ошибка при получении страницы новостей: {e}")
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if selected is not None:
+        build = lambda: news_fields_payload(selected)
+        key = ("news", "response", "fields", selected)
+    else:
+        build = news_payload
+        key = ("news", "response")
+
     try:
-        news = get_news()
-        print(f"✅ Получено {len(news)} новостей из базы данных")
-        
-        # Преобразуем пути к изображениям в полные URL
-        for item in news:
-            if item.get('image'):
-                item['imageUrl'] = get_image_url(item['image'])
-            else:
-                item['imageUrl'] = None
-        
-        return news
+        representation = await get_representation(key, build)
+        return conditional_response(request, representation)
     except Exception as e:
         print(f"❌ Ошибка при получении новостей: {e}")
         import traceback
         print(f"🔍 Полный traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+# Объявлен до /{news_id}, иначе "search" попадет в news_id
+@router.get("/search")
+async def search_news_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос (синтаксис websearch)"),
+    limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+):
+    """Полнотекстовый поиск по новостям: по релевантности, snippet с <mark> вокруг совпадений"""
+    try:
+        results = await search_news(q.strip(), limit)
+        for item in results:
+            item['imageUrl'] = media_url(item['image'])
+        # Запросы почти не повторяются — в кэш контента не кладем, ETag все равно работает
+        return conditional_response(request, make_representation(results, "news"))
+    except Exception as e:
+        print(f"❌ Ошибка при поиске новостей: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+async def news_item_payload(news_id: int):
+    """Новость в форме ответа GET /news/{id}"""
+    news = await get_news_item(news_id)
+    if not news:
+        raise HTTPException(status_code=404, detail="News not found")
+    return news_rows([news])[0]
+
 @router.get("/{news_id}")
-async def get_news_item_endpoint(news_id: int):
+async def get_news_item_endpoint(news_id: int, request: Request):
     """Получить новость по ID"""
     try:
-        news = get_news_item(news_id)
-        if not news:
-            raise HTTPException(status_code=404, detail="News not found")
-        
-        # Преобразуем путь к изображению в полный URL
-        if news.get('image'):
-            news['imageUrl'] = get_image_url(news['image'])
-        else:
-            news['imageUrl'] = None
-            
-        return news
+        representation = await get_representation(
+            ("news", "response", news_id), lambda: news_item_payload(news_id), dated=True
+        )
+        return conditional_response(request, representation)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,58 +1,104 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from ..crud.crud import get_partners, get_partner
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+from ..crud.crud import get_partners, get_partner, get_partners_columns, get_partners_by_ids
 from ..schemas.schemas import Partner
+from ..schemas.rows import PARTNER_LOGO_PREFIX, partner_rows
+from ..utils.batch import parse_ids, order_by_ids
+from ..utils.fields import parse_fields, columns_for, project
+from ..utils.http_cache import get_representation, conditional_response, make_representation
 
 router = APIRouter()
 
-@router.get("/partners", response_model=List[Partner])
-async def get_all_partners():
-    """Получить всех партнеров"""
+# Поля, доступные через ?fields=, и колонки вычисляемых полей
+PARTNER_FIELDS = ("id", "name", "title", "description", "website", "is_active", "logoUrl", "created_at")
+PARTNER_DERIVED_FIELDS = {"logoUrl": ("logo",)}
+
+async def partners_payload():
+    """Партнеры в форме ответа GET /partners (используется и публикатором снимков)"""
+    partners_data = await get_partners()
+    if not partners_data:
+        return []
+    
+    # Строки в форме схемы Partner: без создания pydantic объекта на каждую строку
+    return partner_rows(partners_data)
+
+async def partners_fields_payload(fields: tuple):
+    """Партнеры только с полями fields; из БД читаются только нужные колонки"""
+    rows = await get_partners_columns(columns_for(fields, PARTNER_DERIVED_FIELDS))
+    partners = []
+    for row in rows:
+        if 'logoUrl' in fields:
+            row = {**row, 'logoUrl': PARTNER_LOGO_PREFIX + row['logo'] if row.get('logo') else None}
+        partners.append(project(row, fields))
+    return partners
+
+async def partners_ids_payload(ids: tuple, fields=None):
+    """Партнеры по списку id одним запросом: {"items": [...] в порядке ids, "missing": [...]}"""
+    rows = await get_partners_by_ids(ids, columns_for(fields, PARTNER_DERIVED_FIELDS) if fields else None)
+    items, missing = order_by_ids(rows, ids)
+    if fields is None:
+        return {"items": partner_rows(items), "missing": missing}
+    if 'logoUrl' in fields:
+        items = [{**row, 'logoUrl': PARTNER_LOGO_PREFIX + row['logo'] if row.get('logo') else None} for row in items]
+    return {"items": [project(row, fields) for row in items], "missing": missing}
+
+@router.get("/partners")
+async def get_all_partners(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,logoUrl"),
+    ids: Optional[str] = Query(None, description="id через запятую: несколько партнеров одним запросом"),
+):
+    """
+    Получить всех партнеров (с ?fields= — только указанные поля).
+    С ids — {"items": [...], "missing": [...]} в порядке ids
+    """
+    selected = None
+    if fields is not None:
+        try:
+            selected = parse_fields(fields, PARTNER_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if ids is not None:
+        try:
+            requested = parse_ids(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            # Без кэша контента, как в news.py
+            batch = await partners_ids_payload(requested, selected)
+            return conditional_response(request, make_representation(batch, "partners"))
+        except Exception as e:
+            print(f"❌ Ошибка при получении партнеров по id: {e}")
+            raise HTTPException(status_code=500, detail="Ошибка при получении партнеров")
+
+    if selected is not None:
+        build = lambda: partners_fields_payload(selected)
+        key = ("partners", "response", "fields", selected)
+    else:
+        build = partners_payload
+        key = ("partners", "response")
+
     try:
-        partners_data = get_partners()
-        if not partners_data:
-            return []
-        
-        # Преобразуем данные в объекты Partner
-        partners = []
-        for partner_data in partners_data:
-            partner = Partner(
-                id=partner_data['id'],
-                name=partner_data['name'],
-                title=partner_data.get('title'),
-                description=partner_data.get('description'),
-                website=partner_data.get('website'),
-                is_active=partner_data.get('is_active', True),
-                logoUrl=partner_data.get('logo_url'),
-                created_at=partner_data.get('created_at')
-            )
-            partners.append(partner)
-        
-        return partners
+        representation = await get_representation(key, build)
+        return conditional_response(request, representation)
     except Exception as e:
         print(f"❌ Ошибка в get_all_partners: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при получении партнеров")
 
 @router.get("/partners/{partner_id}", response_model=Partner)
-async def get_partner_by_id(partner_id: int):
+async def get_partner_by_id(partner_id: int, request: Request):
     """Получить партнера по ID"""
-    try:
-        partner_data = get_partner(partner_id)
+    async def build():
+        partner_data = await get_partner(partner_id)
         if not partner_data:
             raise HTTPException(status_code=404, detail="Партнер не найден")
         
-        partner = Partner(
-            id=partner_data['id'],
-            name=partner_data['name'],
-            title=partner_data.get('title'),
-            description=partner_data.get('description'),
-            website=partner_data.get('website'),
-            is_active=partner_data.get('is_active', True),
-            logoUrl=partner_data.get('logo_url'),
-            created_at=partner_data.get('created_at')
-        )
-        
-        return partner
+        return partner_rows([partner_data])[0]
+
+    try:
+        representation = await get_representation(("partners", "response", partner_id), build)
+        return conditional_response(request, representation)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Асинхронный доступ к базе данных для FastAPI эндпоинтов
+Использует psycopg 3 (AsyncConnectionPool): запросы не блокируют event loop,
+SQL остается тем же (плейсхолдеры %s), строки возвращаются словарями
+"""
+
+import time
+from contextlib import asynccontextmanager
+
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from ..utils.instrumentation import observe_query
+from .database import (
+    BULK_INSERT_PAGE_SIZE,
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+)
+
+_pool = None
+
+
+def get_conninfo():
+    """Строка подключения psycopg 3 из тех же настроек, что и database.py"""
+    return make_conninfo(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        client_encoding="utf8",
+    )
+
+
+def _create_pool():
+    return AsyncConnectionPool(
+        conninfo=get_conninfo(),
+        min_size=DB_POOL_SIZE,
+        max_size=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+        timeout=DB_POOL_TIMEOUT,
+        max_lifetime=DB_POOL_RECYCLE,
+        check=AsyncConnectionPool.check_connection if DB_POOL_PRE_PING else None,
+        kwargs={"row_factory": dict_row},
+        name="startlab-async",
+        open=False,
+    )
+
+
+async def init_async_pool():
+    """Открывает асинхронный пул (вызывается из lifespan FastAPI)"""
+    global _pool
+    if _pool is None:
+        _pool = _create_pool()
+        # wait=False: приложение стартует, даже если БД еще поднимается
+        await _pool.open(wait=False)
+    return _pool
+
+
+async def close_async_pool():
+    """Закрывает асинхронный пул"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_async_pool_stats():
+    """Статистика асинхронного пула"""
+    if _pool is None:
+        return {"status": "not_initialized"}
+    return _pool.get_stats()
+
+
+@asynccontextmanager
+async def get_async_db():
+    """Соединение из асинхронного пула; commit при успехе, rollback при ошибке"""
+    pool = _pool or await init_async_pool()
+    async with pool.connection() as connection:
+        yield connection
+
+
+@asynccontextmanager
+async def transaction():
+    """
+    Одна транзакция на одном соединении:
+
+        async with transaction() as conn:
+            await execute_query("INSERT ...", params, fetch=False, connection=conn)
+    """
+    async with get_async_db() as connection:
+        async with connection.transaction():
+            yield connection
+
+
+@asynccontextmanager
+async def savepoint(connection):
+    """
+    SAVEPOINT внутри transaction(): при ошибке откатывается только этот блок,
+    исключение пробрасывается вызывающему коду
+    """
+    async with connection.transaction():
+        yield connection
+
+
+async def _run(connection, query, params, fetch):
+    started = time.perf_counter()
+    try:
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            result = await cursor.fetchall() if fetch else cursor.rowcount
+    except Exception as e:
+        observe_query(query, started, error=e)
+        raise
+    observe_query(query, started, len(result) if fetch else result)
+    return result
+
+
+async def execute_query(query, params=None, fetch=True, connection=None):
+    """Асинхронный аналог database.execute_query"""
+    try:
+        if connection is not None:
+            return await _run(connection, query, params, fetch)
+        async with get_async_db() as conn:
+            return await _run(conn, query, params, fetch)
+    except Exception as e:
+        if connection is not None:
+            # Внутри transaction() ошибка должна откатить всю транзакцию
+            raise
+        print(f"❌ Ошибка в async execute_query: {e}")
+        if fetch:
+            return []
+        else:
+            return 0
+
+
+async def _run_single(connection, query, params):
+    started = time.perf_counter()
+    try:
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            # INSERT/UPDATE без RETURNING не возвращают строк
+            result = await cursor.fetchone() if cursor.description is not None else None
+    except Exception as e:
+        observe_query(query, started, error=e)
+        raise
+    observe_query(query, started, 0 if result is None else 1)
+    return result
+
+
+async def execute_single_query(query, params=None, connection=None):
+    """Асинхронный аналог database.execute_single_query"""
+    if connection is not None:
+        return await _run_single(connection, query, params)
+    async with get_async_db() as conn:
+        return await _run_single(conn, query, params)
+
+
+async def bulk_insert(table, columns, rows, connection=None):
+    """
+    Многострочный INSERT INTO table (columns) VALUES (...), (...), ...
+    Одна команда на пачку из BULK_INSERT_PAGE_SIZE строк; возвращает число вставленных строк
+    """
+    rows = [tuple(row) for row in rows]
+    if not rows:
+        return 0
+
+    head = sql.SQL("INSERT INTO {} ({}) VALUES ").format(
+        sql.Identifier(table),
+        sql.SQL(",").join(sql.Identifier(column) for column in columns),
+    )
+    row_template = sql.SQL("({})").format(sql.SQL(",").join(sql.Placeholder() * len(columns)))
+
+    async def _insert(conn):
+        inserted = 0
+        async with conn.cursor() as cursor:
+            for start in range(0, len(rows), BULK_INSERT_PAGE_SIZE):
+                page = rows[start:start + BULK_INSERT_PAGE_SIZE]
+                query = head + sql.SQL(",").join([row_template] * len(page))
+                started = time.perf_counter()
+                try:
+                    await cursor.execute(query, [value for row in page for value in row])
+                except Exception as e:
+                    observe_query(f"INSERT INTO {table} (bulk)", started, error=e)
+                    raise
+                observe_query(f"INSERT INTO {table} (bulk)", started, cursor.rowcount)
+                inserted += cursor.rowcount
+        return inserted
+
+    if connection is not None:
+        return await _insert(connection)
+    async with get_async_db() as conn:
+        return await _insert(conn)
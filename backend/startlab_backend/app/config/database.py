@@ -5,11 +5,17 @@
 """
 
 import os
+import threading
+import time
+from collections import deque
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions, sql
+from psycopg2.extras import RealDictCursor, execute_values
 from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from ..utils.instrumentation import observe_query
+
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -102,58 +108,369 @@ def get_connection():
         print(f"  DB_USER: {DB_USER}")
         raise
 
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Соединение, возвращенное в пул недавно, выдается без проверки, секунды
+DB_POOL_PRE_PING_INTERVAL = float(os.getenv("DB_POOL_PRE_PING_INTERVAL", "5"))
+
+# Сколько строк отправлять одной командой при массовой вставке
+BULK_INSERT_PAGE_SIZE = int(os.getenv("DB_BULK_INSERT_PAGE_SIZE", "1000"))
+
+
+class PoolTimeout(Exception):
+    """Не удалось получить соединение из пула за DB_POOL_TIMEOUT секунд"""
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2.
+
+    - size: сколько соединений держим открытыми между запросами
+    - max_overflow: сколько соединений можно открыть сверх size под нагрузкой
+      (они закрываются при возврате в пул)
+    - timeout: сколько секунд ждать свободное соединение
+    - recycle: максимальный возраст соединения в секундах
+    - pre_ping: проверять соединение перед выдачей (одним SELECT 1), если оно
+      простаивало дольше pre_ping_interval секунд
+    """
+
+    def __init__(self, size, max_overflow, timeout, recycle, pre_ping=True, pre_ping_interval=0):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.pre_ping_interval = pre_ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._born = {}
+        self._returned = {}
+        self._open = 0
+        self._checked_out = 0
+        self._closed = False
+
+        self._stats = {
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "pings": 0,
+            "ping_failures": 0,
+            "checkout_waits": 0,
+            "checkout_timeouts": 0,
+        }
+
+    def _connect(self):
+        connection = get_connection()
+        with self._cond:
+            self._born[id(connection)] = time.monotonic()
+            self._stats["connections_created"] += 1
+        return connection
+
+    def _discard(self, connection):
+        # Condition по умолчанию на RLock: можно звать и из-под self._cond
+        with self._cond:
+            self._born.pop(id(connection), None)
+            self._returned.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, connection):
+        if connection.closed:
+            return False
+        now = time.monotonic()
+        # Счетчики и метки времени — под self._cond, как счетчики выдачи;
+        # сам ping идет без блокировки
+        with self._cond:
+            if self.recycle > 0 and now - self._born.get(id(connection), 0) > self.recycle:
+                self._stats["connections_recycled"] += 1
+                return False
+            need_ping = self.pre_ping and now - self._returned.get(id(connection), 0) > self.pre_ping_interval
+            if need_ping:
+                self._stats["pings"] += 1
+        if need_ping:
+            try:
+                # autocommit на время проверки: один круг до БД, без BEGIN и ROLLBACK
+                connection.autocommit = True
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                finally:
+                    connection.autocommit = False
+            except Exception:
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                return False
+        return True
+
+    def getconn(self):
+        """Выдает соединение из пула (или открывает новое в пределах size + max_overflow)"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул соединений закрыт")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["checkout_timeouts"] += 1
+                    raise PoolTimeout(
+                        f"Нет свободных соединений в пуле за {self.timeout} с "
+                        f"(size={self.size}, max_overflow={self.max_overflow})"
+                    )
+                self._stats["checkout_waits"] += 1
+                self._cond.wait(remaining)
+            self._checked_out += 1
+
+        try:
+            if connection is not None and not self._is_usable(connection):
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = self._connect()
+            return connection
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, connection, discard=False):
+        """Возвращает соединение в пул; лишние (overflow) и сломанные соединения закрываются"""
+        if not discard and not connection.closed:
+            try:
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._checked_out -= 1
+            if discard or connection.closed or self._closed or len(self._idle) >= self.size:
+                self._open -= 1
+                self._discard(connection)
+            else:
+                self._returned[id(connection)] = time.monotonic()
+                self._idle.append(connection)
+            self._cond.notify()
+
+    def close(self):
+        """Закрывает все простаивающие соединения; выданные закроются при возврате"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._open -= 1
+                self._discard(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "timeout": self.timeout,
+                "recycle": self.recycle,
+                "pre_ping": self.pre_ping,
+                "pre_ping_interval": self.pre_ping_interval,
+                "open": self._open,
+                "idle": len(self._idle),
+                "checked_out": self._checked_out,
+                "overflow": max(0, self._open - self.size),
+                **self._stats,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool():
+    """
+    Создает общий пул соединений. API работает через async_database, поэтому
+    синхронный пул открывается по требованию — скриптами (get_pool / get_db)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                timeout=DB_POOL_TIMEOUT,
+                recycle=DB_POOL_RECYCLE,
+                pre_ping=DB_POOL_PRE_PING,
+                pre_ping_interval=DB_POOL_PRE_PING_INTERVAL,
+            )
+        return _pool
+
+
+def close_pool():
+    """Закрывает общий пул соединений"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool():
+    """Возвращает общий пул, создавая его при первом обращении (скрипты без lifespan)"""
+    return _pool or init_pool()
+
+
+def get_pool_stats():
+    """Статистика пула соединений"""
+    if _pool is None:
+        return {"status": "not_initialized"}
+    return _pool.stats()
+
+
 @contextmanager
 def get_db():
-    """Контекстный менеджер для работы с базой данных"""
-    connection = None
+    """Контекстный менеджер для работы с базой данных (соединение берется из пула)"""
+    pool = get_pool()
+    connection = pool.getconn()
+    discard = False
     try:
-        connection = get_connection()
         yield connection
-    except Exception as e:
-        if connection:
+    except Exception:
+        try:
             connection.rollback()
+        except Exception:
+            discard = True
         raise
     finally:
-        if connection:
-            connection.close()
+        pool.putconn(connection, discard=discard)
 
-def execute_query(query, params=None, fetch=True):
-    """Выполняет SQL запрос с параметрами"""
+@contextmanager
+def transaction():
+    """
+    Одна транзакция на одном соединении с одним COMMIT в конце:
+
+        with transaction() as conn:
+            execute_query("INSERT ...", params, fetch=False, connection=conn)
+            execute_query("INSERT ...", params, fetch=False, connection=conn)
+
+    При исключении вся транзакция откатывается.
+    """
+    with get_db() as connection:
+        yield connection
+        connection.commit()
+
+
+@contextmanager
+def savepoint(connection, name="sp"):
+    """
+    SAVEPOINT внутри transaction(): при ошибке откатывается только этот блок,
+    остальная транзакция продолжает работу (исключение пробрасывается дальше)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SAVEPOINT {name}")
+    try:
+        yield connection
+    except Exception:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        raise
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+
+def _run(connection, query, params, fetch):
+    started = time.perf_counter()
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            result = cursor.fetchall() if fetch else cursor.rowcount
+    except Exception as e:
+        observe_query(query, started, error=e)
+        raise
+    observe_query(query, started, len(result) if fetch else result)
+    return result
+
+
+def _run_single(connection, query, params):
+    started = time.perf_counter()
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            # INSERT/UPDATE без RETURNING не возвращают строк
+            result = cursor.fetchone() if cursor.description else None
+    except Exception as e:
+        observe_query(query, started, error=e)
+        raise
+    observe_query(query, started, 0 if result is None else 1)
+    return result
+
+
+def execute_query(query, params=None, fetch=True, connection=None):
+    """Выполняет SQL запрос с параметрами (внутри transaction() — без отдельного commit)"""
+    if connection is not None:
+        return _run(connection, query, params, fetch)
     try:
         with get_db() as connection:
-            with connection.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, params)
-                if fetch:
-                    result = cursor.fetchall()
-                    print(f"🔍 execute_query: получен результат: {result}")
-                    print(f"🔍 execute_query: тип результата: {type(result)}")
-                    if result and len(result) > 0:
-                        print(f"🔍 execute_query: первая строка: {result[0]}")
-                        print(f"🔍 execute_query: тип первой строки: {type(result[0])}")
-                    return result
-                else:
-                    connection.commit()
-                    return cursor.rowcount
+            result = _run(connection, query, params, fetch)
+            if not fetch:
+                connection.commit()
+            return result
     except Exception as e:
         print(f"❌ Ошибка в execute_query: {e}")
-        import traceback
-        print(f"🔍 Traceback: {traceback.format_exc()}")
         if fetch:
             return []
         else:
             return 0
 
-def execute_single_query(query, params=None):
+def execute_single_query(query, params=None, connection=None):
     """Выполняет SQL запрос и возвращает одну запись"""
+    if connection is not None:
+        return _run_single(connection, query, params)
     with get_db() as connection:
-        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            # Коммитим только для INSERT/UPDATE/DELETE операций
-            query_upper = query.strip().upper()
-            if any(query_upper.startswith(cmd) for cmd in ['INSERT', 'UPDATE', 'DELETE']):
-                connection.commit()
-            return result
+        result = _run_single(connection, query, params)
+        # Коммитим только для INSERT/UPDATE/DELETE операций
+        query_upper = query.strip().upper()
+        if any(query_upper.startswith(cmd) for cmd in ['INSERT', 'UPDATE', 'DELETE']):
+            connection.commit()
+        return result
+
+def bulk_insert(table, columns, rows, connection=None, page_size=BULK_INSERT_PAGE_SIZE):
+    """
+    Массовая вставка через execute_values: INSERT ... VALUES (...), (...), ...
+    одной командой на page_size строк (для импорта архивных заявок и т.п.)
+    """
+    rows = [tuple(row) for row in rows]
+    if not rows:
+        return 0
+
+    def _insert(conn):
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table),
+            sql.SQL(",").join(sql.Identifier(column) for column in columns),
+        ).as_string(conn)
+        with conn.cursor() as cursor:
+            inserted = 0
+            for start in range(0, len(rows), page_size):
+                page = rows[start:start + page_size]
+                started = time.perf_counter()
+                try:
+                    execute_values(cursor, query, page, page_size=len(page))
+                except Exception as e:
+                    observe_query(f"INSERT INTO {table} (bulk)", started, error=e)
+                    raise
+                observe_query(f"INSERT INTO {table} (bulk)", started, cursor.rowcount)
+                inserted += cursor.rowcount
+            return inserted
+
+    if connection is not None:
+        return _insert(connection)
+    with transaction() as conn:
+        return _insert(conn)
 
 def create_tables():
     """Создает все таблицы используя SQL скрипты"""
@@ -1,8 +1,11 @@
-from ..config.database import execute_query, execute_single_query
+from ..config.async_database import execute_query, execute_single_query
+from ..utils.cache import cached_content
+from ..utils.fields import column_list
 from typing import List, Dict, Any
 
 # Partner функции
-def get_partners() -> List[Dict[str, Any]]:
+@cached_content("partners")
+async def get_partners() -> List[Dict[str, Any]]:
     """Получить всех партнеров"""
     try:
         query = """
@@ -11,70 +14,36 @@ def get_partners() -> List[Dict[str, Any]]:
             WHERE is_active = true 
             ORDER BY name
         """
-        print(f"🔍 Выполняем запрос партнеров: {query}")
-        
-        result = execute_query(query)
-        print(f"🔍 Результат execute_query для партнеров: {result}")
-        
-        if result is None:
-            print("🔍 Результат None, возвращаем []")
-            return []
-        
-        if len(result) == 0:
-            print("🔍 Результат пустой, возвращаем []")
-            return []
-        
-        # Преобразуем в список словарей
-        cleaned_result = []
-        for i, row in enumerate(result):
-            print(f"🔍 Обрабатываем партнера {i}: {row}")
-            
-            if isinstance(row, dict):
-                print(f"🔍 Партнер уже словарь: {row}")
-                # Добавляем URL для логотипа
-                if row.get('logo'):
-                    row['logo_url'] = f"/media/{row['logo']}"
-                cleaned_result.append(row)
-            else:
-                print(f"🔍 Партнер не словарь, создаем словарь")
-                cleaned_row = {
-                    'id': getattr(row, 'id', None),
-                    'name': getattr(row, 'name', ''),
-                    'title': getattr(row, 'title', None),
-                    'description': getattr(row, 'description', None),
-                    'website': getattr(row, 'website', None),
-                    'is_active': getattr(row, 'is_active', True),
-                    'created_at': getattr(row, 'created_at', None)
-                }
-                # Добавляем URL для логотипа
-                logo = getattr(row, 'logo', None)
-                if logo:
-                    cleaned_row['logo_url'] = f"/media/{logo}"
-                print(f"🔍 Созданный словарь партнера: {cleaned_row}")
-                cleaned_result.append(cleaned_row)
-        
-        print(f"🔍 Финальный результат партнеров: {cleaned_result}")
-        return cleaned_result
+        # URL логотипа строит schemas.rows.partner_rows
+        return await execute_query(query) or []
     except Exception as e:
         print(f"❌ Ошибка в get_partners: {e}")
-        import traceback
-        print(f"🔍 Traceback: {traceback.format_exc()}")
         return []
 
-def get_partner(partner_id: int) -> Dict[str, Any]:
+@cached_content("partners")
+async def get_partners_columns(columns: tuple) -> List[Dict[str, Any]]:
+    """Активные партнеры, только перечисленные колонки (?fields=)"""
+    query = f"""
+        SELECT {column_list(columns)}
+        FROM partners 
+        WHERE is_active = true 
+        ORDER BY name
+    """
+    return await execute_query(query)
+
+@cached_content("partners")
+async def get_partner(partner_id: int) -> Dict[str, Any]:
     """Получить партнера по ID"""
     query = """
         SELECT id, name, title, logo, description, website, is_active, created_at
         FROM partners 
         WHERE id = %s AND is_active = true
     """
-    result = execute_single_query(query, (partner_id,))
-    if result and result.get('logo'):
-        result['logo_url'] = f"/media/{result['logo']}"
-    return result
+    return await execute_single_query(query, (partner_id,))
 
 # FAQ функции
-def get_faqs() -> List[Dict[str, Any]]:
+@cached_content("faqs")
+async def get_faqs() -> List[Dict[str, Any]]:
     """Получить все FAQ"""
     try:
         query = """
@@ -83,67 +52,39 @@ def get_faqs() -> List[Dict[str, Any]]:
             WHERE is_active = true 
             ORDER BY "order"
         """
-        print(f"🔍 Выполняем запрос: {query}")
-        
-        result = execute_query(query)
-        print(f"🔍 Результат execute_query: {result}")
-        print(f"🔍 Тип результата: {type(result)}")
-        print(f"🔍 Длина результата: {len(result) if result else 0}")
-        
-        # Простая обработка результата
-        if result is None:
-            print("🔍 Результат None, возвращаем []")
-            return []
-        
-        if len(result) == 0:
-            print("🔍 Результат пустой, возвращаем []")
-            return []
-        
-        # Преобразуем в список словарей
-        cleaned_result = []
-        for i, row in enumerate(result):
-            print(f"🔍 Обрабатываем строку {i}: {row}")
-            print(f"🔍 Тип строки: {type(row)}")
-            
-            if isinstance(row, dict):
-                print(f"🔍 Строка уже словарь: {row}")
-                # Просто добавляем строку как есть, кодировка исправлена на уровне подключения
-                cleaned_result.append(row)
-            else:
-                # Если row не словарь, создаем словарь
-                print(f"🔍 Строка не словарь, создаем словарь")
-                cleaned_row = {
-                    'id': getattr(row, 'id', None),
-                    'question': getattr(row, 'question', ''),
-                    'answer': getattr(row, 'answer', ''),
-                    'order': getattr(row, 'order', 0),
-                    'is_active': getattr(row, 'is_active', True),
-                    'created_at': getattr(row, 'created_at', None)
-                }
-                print(f"🔍 Созданный словарь: {cleaned_row}")
-                cleaned_result.append(cleaned_row)
-        
-        print(f"🔍 Финальный результат: {cleaned_result}")
-        return cleaned_result
+        result = await execute_query(query)
+        # Строки уже словари, кодировка исправлена на уровне подключения
+        return result or []
     except Exception as e:
         print(f"❌ Ошибка в get_faqs: {e}")
-        import traceback
-        print(f"🔍 Traceback: {traceback.format_exc()}")
         return []
 
-def get_faq(faq_id: int) -> Dict[str, Any]:
+@cached_content("faqs")
+async def get_faqs_columns(columns: tuple) -> List[Dict[str, Any]]:
+    """Активные FAQ, только перечисленные колонки (?fields=)"""
+    query = f"""
+        SELECT {column_list(columns)}
+        FROM faqs 
+        WHERE is_active = true 
+        ORDER BY "order"
+    """
+    return await execute_query(query)
+
+@cached_content("faqs")
+async def get_faq(faq_id: int) -> Dict[str, Any]:
     """Получить FAQ по ID"""
     query = """
         SELECT id, question, answer, "order", is_active, image, created_at
         FROM faqs 
         WHERE id = %s AND is_active = true
     """
-    return execute_single_query(query, (faq_id,))
+    return await execute_single_query(query, (faq_id,))
 
 
 
 # News функции
-def get_news() -> List[Dict[str, Any]]:
+@cached_content("news")
+async def get_news() -> List[Dict[str, Any]]:
     """Получить все новости"""
     try:
         query = """
@@ -152,54 +93,115 @@ def get_news() -> List[Dict[str, Any]]:
             WHERE is_active = true 
             ORDER BY created_at DESC
         """
-        print(f"🔍 Выполняем запрос новостей: {query}")
-        
-        result = execute_query(query)
-        print(f"🔍 Результат execute_query для новостей: {result}")
-        
-        if result is None:
-            print("🔍 Результат None, возвращаем []")
-            return []
-        
-        if len(result) == 0:
-            print("🔍 Результат пустой, возвращаем []")
-            return []
-        
-        # Преобразуем в список словарей
-        cleaned_result = []
-        for i, row in enumerate(result):
-            print(f"🔍 Обрабатываем новость {i}: {row}")
-            
-            if isinstance(row, dict):
-                print(f"🔍 Новость уже словарь: {row}")
-                cleaned_result.append(row)
-            else:
-                print(f"🔍 Новость не словарь, создаем словарь")
-                cleaned_row = {
-                    'id': getattr(row, 'id', None),
-                    'title': getattr(row, 'title', ''),
-                    'content': getattr(row, 'content', ''),
-                    'image_url': getattr(row, 'image_url', None),
-                    'is_active': getattr(row, 'is_active', True),
-                    'created_at': getattr(row, 'created_at', None),
-                    'updated_at': getattr(row, 'updated_at', None)
-                }
-                print(f"🔍 Созданный словарь новости: {cleaned_row}")
-                cleaned_result.append(cleaned_row)
-        
-        print(f"🔍 Финальный результат новостей: {cleaned_result}")
-        return cleaned_result
+        result = await execute_query(query)
+        return result or []
     except Exception as e:
         print(f"❌ Ошибка в get_news: {e}")
-        import traceback
-        print(f"🔍 Traceback: {traceback.format_exc()}")
         return []
 
-def get_news_item(news_id: int) -> Dict[str, Any]:
+@cached_content("news")
+async def get_news_columns(columns: tuple) -> List[Dict[str, Any]]:
+    """Активные новости, только перечисленные колонки (?fields=)"""
+    query = f"""
+        SELECT {column_list(columns)}
+        FROM news 
+        WHERE is_active = true 
+        ORDER BY created_at DESC
+    """
+    return await execute_query(query)
+
+@cached_content("news")
+async def get_news_page(limit: int, after_created_at=None, after_id=None, excerpt_length: int = 200) -> List[Dict[str, Any]]:
+    """
+    Страница новостей без content (keyset по (created_at, id), от новых к старым).
+    Возвращает до limit + 1 строк: лишняя строка означает, что есть следующая страница
+    """
+    after = ""
+    params = [excerpt_length]
+    if after_created_at is not None:
+        after = "AND (created_at, id) < (%s, %s)"
+        params += [after_created_at, after_id]
+    params.append(limit + 1)
+    query = f"""
+        SELECT id, title, image, is_active, created_at, updated_at,
+               left(regexp_replace(content, '<[^>]*>', '', 'g'), %s) AS excerpt
+        FROM news
+        WHERE is_active = true {after}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """
+    return await execute_query(query, tuple(params))
+
+@cached_content("news")
+async def get_news_item(news_id: int) -> Dict[str, Any]:
     """Получить новость по ID"""
     query = """
         SELECT id, title, content, image, is_active, created_at, updated_at
         FROM news 
         WHERE id = %s AND is_active = true
     """
-    return execute_single_query(query, (news_id,))
+    return await execute_single_query(query, (news_id,))
+
+# Полнотекстовый поиск (search_vector + GIN, см. scripts/create_db_and_tables.py).
+# Ранжирование по индексу, ts_headline считается только для строк итоговой страницы
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+async def search_news(q: str, limit: int) -> List[Dict[str, Any]]:
+    """Поиск по новостям (русская морфология), от самых релевантных"""
+    query = """
+        SELECT n.id, n.title, n.image, n.created_at, n.updated_at, found.rank,
+               ts_headline('russian', strip_html(n.content), found.query, %s) AS snippet
+        FROM (
+            SELECT id, query, ts_rank_cd(search_vector, query) AS rank
+            FROM news, websearch_to_tsquery('russian', %s) AS query
+            WHERE is_active = true AND search_vector @@ query
+            ORDER BY rank DESC, created_at DESC
+            LIMIT %s
+        ) AS found
+        JOIN news n ON n.id = found.id
+        ORDER BY found.rank DESC, n.created_at DESC
+    """
+    return await execute_query(query, (SEARCH_HEADLINE_OPTIONS, q, limit))
+
+async def search_faqs(q: str, limit: int) -> List[Dict[str, Any]]:
+    """Поиск по FAQ (русская морфология), от самых релевантных"""
+    query = """
+        SELECT f.id, f.question, f."order", f.image, found.rank,
+               ts_headline('russian', strip_html(f.answer), found.query, %s) AS snippet
+        FROM (
+            SELECT id, query, ts_rank_cd(search_vector, query) AS rank
+            FROM faqs, websearch_to_tsquery('russian', %s) AS query
+            WHERE is_active = true AND search_vector @@ query
+            ORDER BY rank DESC, "order"
+            LIMIT %s
+        ) AS found
+        JOIN faqs f ON f.id = found.id
+        ORDER BY found.rank DESC, f."order"
+    """
+    return await execute_query(query, (SEARCH_HEADLINE_OPTIONS, q, limit))
+
+# Пакетная выборка по id (?ids=): один запрос на список id, порядок восстанавливает роутер
+async def _get_by_ids(table: str, ids: tuple, columns: tuple) -> List[Dict[str, Any]]:
+    if "id" not in columns:
+        columns = ("id",) + tuple(columns)
+    query = f"""
+        SELECT {column_list(columns)}
+        FROM {table}
+        WHERE id = ANY(%s) AND is_active = true
+    """
+    return await execute_query(query, (list(ids),))
+
+async def get_partners_by_ids(ids: tuple, columns: tuple = None) -> List[Dict[str, Any]]:
+    """Активные партнеры с id из ids"""
+    columns = columns or ("id", "name", "title", "logo", "description", "website", "is_active", "created_at")
+    return await _get_by_ids("partners", ids, columns)
+
+async def get_faqs_by_ids(ids: tuple, columns: tuple = None) -> List[Dict[str, Any]]:
+    """Активные FAQ с id из ids"""
+    columns = columns or ("id", "question", "answer", "order", "is_active", "image", "created_at")
+    return await _get_by_ids("faqs", ids, columns)
+
+async def get_news_by_ids(ids: tuple, columns: tuple = None) -> List[Dict[str, Any]]:
+    """Активные новости с id из ids"""
+    columns = columns or ("id", "title", "content", "image", "is_active", "created_at", "updated_at")
+    return await _get_by_ids("news", ids, columns)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Реестр форм и их вопросов в памяти воркера.
+
+Формы меняются только в админке, а читаются на каждой заявке: вместо
+SELECT ... WHERE name ILIKE '%наука%' (полный просмотр forms) и JOIN
+form_questions/submission_questions на каждый запрос реестр загружается
+при старте двумя запросами и перезагружается по NOTIFY {"resource": "forms"}
+из админки (admin_panel/signals.py, см. utils/content_events.py).
+
+FORM_REGISTRY_TTL — страховка на случай потерянного уведомления
+(или CONTENT_NOTIFY_ENABLED=false): реестр старше TTL перезагружается.
+"""
+
+import asyncio
+import os
+import time
+
+from .config.async_database import execute_query, get_async_db
+from .utils.content_events import on_content_changed
+
+FORM_REGISTRY_TTL = float(os.getenv("FORM_REGISTRY_TTL", "300"))
+
+# Вид заявки -> подстрока названия формы (как в прежних запросах ILIKE)
+FORM_TYPES = {
+    "science": "наука",
+    "startup": "стартап",
+}
+
+_registry = None
+_loaded_at = 0.0
+_lock = None
+_refresh_task = None
+_stale = False
+
+
+async def _load():
+    # Ошибки БД пробрасываются: пустой реестр вместо недоступной БД хуже старого
+    async with get_async_db() as conn:
+        forms = await execute_query(
+            "SELECT id, name, submission_id FROM forms ORDER BY id", connection=conn
+        )
+        questions = await execute_query(
+            """
+            SELECT
+                fq.form_id,
+                fq.id AS form_question_id,
+                fq.question_text,
+                sq.question_order
+            FROM form_questions fq
+            JOIN submission_questions sq ON sq.id = fq.submission_question_id
+            ORDER BY fq.form_id, sq.question_order
+            """,
+            connection=conn,
+        )
+
+    by_id = {}
+    for form in forms:
+        by_id[form["id"]] = {**form, "questions": [], "question_ids": set()}
+    for question in questions:
+        form = by_id.get(question.pop("form_id"))
+        if form is not None:
+            form["questions"].append(question)
+            form["question_ids"].add(question["form_question_id"])
+
+    by_type = {}
+    for kind, name_part in FORM_TYPES.items():
+        for form in by_id.values():
+            if name_part in (form["name"] or "").lower():
+                by_type[kind] = form["id"]
+                break
+    return {"forms": by_id, "by_type": by_type}
+
+
+async def refresh_forms():
+    """Перезагружает реестр (одна загрузка на воркер, даже при параллельных вызовах)"""
+    global _registry, _loaded_at, _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    started = time.monotonic()
+    async with _lock:
+        # Пока ждали блокировку, реестр уже перечитали после нашего вызова
+        if _loaded_at > started:
+            return _registry
+        load_started = time.monotonic()
+        registry = await _load()
+        # Реестр заменяется целиком: читатели видят либо старый, либо новый
+        _registry, _loaded_at = registry, load_started
+    print(f"✅ Реестр форм: {len(registry['forms'])} форм")
+    return registry
+
+
+async def get_registry():
+    if _registry is None:
+        return await refresh_forms()
+    if time.monotonic() - _loaded_at > FORM_REGISTRY_TTL:
+        try:
+            return await refresh_forms()
+        except Exception as e:
+            print(f"❌ Ошибка загрузки реестра форм, используется прежний: {e}")
+    return _registry
+
+
+async def get_form(form_id):
+    """Форма с вопросами по id или None"""
+    return (await get_registry())["forms"].get(form_id)
+
+
+async def get_form_by_type(kind):
+    """Форма для вида заявки ("science", "startup") или None"""
+    registry = await get_registry()
+    form_id = registry["by_type"].get(kind)
+    return registry["forms"].get(form_id) if form_id is not None else None
+
+
+def _schedule_refresh(resource=None, object_id=None):
+    """Обработчик изменений: формы или неизвестное изменение -> перезагрузка в фоне"""
+    global _refresh_task, _stale
+    if resource not in (None, "forms"):
+        return
+    _stale = True
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_loop(), name="form-registry")
+
+
+async def _refresh_loop():
+    global _stale
+    # Изменения, пришедшие во время загрузки, дают еще один проход
+    while _stale:
+        _stale = False
+        await _refresh_logged()
+
+
+async def _refresh_logged():
+    try:
+        await refresh_forms()
+    except Exception as e:
+        # Остается прежний реестр; следующая попытка — по TTL или уведомлению
+        print(f"❌ Ошибка загрузки реестра форм: {e}")
+
+
+async def start_form_registry():
+    """Загружает реестр и подписывает его на изменения (из lifespan)"""
+    on_content_changed(_schedule_refresh)
+    await _refresh_logged()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Единый конвейер приема заявок: normalize -> hash -> write.
+
+/app/intake, /app/intake-startup и обе ветки /app/intake-unified делегируют сюда.
+Вид заявки определяет таблицу ответов и набор полей:
+
+    science -> answers   + team + supervisor_2
+    startup -> answer_2  + team
+
+Заявка, ее команда и руководитель записываются одной командой
+(INSERT с data-modifying CTE): один круг до БД вместо отдельных INSERT,
+SAVEPOINT и RELEASE. Если БД отвергла данные (например, слишком длинное
+значение), запись повторяется по частям в одной транзакции, а проблемные
+участники пропускаются — как раньше. Ошибки соединения и пула
+не маскируются и уходят вызывающему.
+
+Повторы (двойной клик, ретраи клиента) не пишут дублей: та же команда
+сначала занимает ключ идемпотентности в intake_requests
+(ON CONFLICT DO NOTHING), а остальные части вставляются, только если ключ
+занят этой командой. Ключ — заголовок Idempotency-Key или, без него,
+sha256 содержимого заявки. На повтор возвращается sha256 исходной заявки,
+а повтор ключа с другим содержимым отклоняется (IdempotencyConflict).
+
+Групповой sha256, связывающий строки заявки, равен ключу: с заголовком две
+одинаковые по содержимому заявки с разными ключами не сливаются в одну группу.
+"""
+
+import hashlib
+import json
+
+import psycopg
+
+from .config.async_database import execute_single_query, transaction, savepoint, bulk_insert
+from .utils.fields import column_list
+
+SCIENCE_FIELDS = (
+    "title", "relevance", "goal", "tasks", "description", "expectedResults",
+    "marketAssessment", "competitionAnalysis", "budgetBYN", "timeline",
+)
+STARTUP_FIELDS = (
+    "title", "problemStatementShort", "goal", "stageAndNextSteps", "description",
+    "founderMotivationAndExpertise", "expectedResults", "benefitForBelarus", "marketAssessment",
+    "monetization", "competitionAnalysis", "budgetBYN", "needsInvestmentNow", "timeline",
+)
+
+# вид заявки -> (таблица ответов, поля заявки, есть ли руководитель)
+INTAKE_KINDS = {
+    "science": ("answers", SCIENCE_FIELDS, True),
+    "startup": ("answer_2", STARTUP_FIELDS, False),
+}
+
+TEAM_COLUMNS = (
+    "lastName", "firstName", "middleName", "faculty", "group", "phone", "email", "keySkills", "role", "sha256"
+)
+SUPERVISOR_COLUMNS = ("fullName", "academicTitle", "position", "phone", "email", "sha256")
+EXTRA_COLUMNS = ("label", "url", "additionalInfo", "sha256")
+
+IDEMPOTENCY_CLAIM = """
+    INSERT INTO intake_requests ("key", "kind", "sha256", "content_sha256") VALUES (%s, %s, %s, %s)
+    ON CONFLICT ("key") DO NOTHING
+    RETURNING "sha256"
+"""
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key уже использован для заявки с другим содержимым"""
+
+
+def split_full_name(full_name):
+    """"Фамилия Имя Отчество" -> (last, first, middle); одно слово считается именем"""
+    parts = (full_name or "").split()
+    if len(parts) >= 2:
+        return parts[0], parts[1], " ".join(parts[2:]) or None
+    if parts:
+        return None, parts[0], None
+    return None, None, None
+
+
+def normalize(payload, kind):
+    """
+    JSON заявки -> строки для записи (без sha256, он добавляется при записи).
+    Участник сохраняется, даже если ФИО неполное: недостающие части — None
+    """
+    _, fields, with_supervisor = INTAKE_KINDS[kind]
+    attachments = payload.get("attachments") or []
+    first_attachment = (attachments[0] if attachments else None) or {}
+
+    team = []
+    for member in payload.get("team") or []:
+        member = member or {}
+        last_name, first_name, middle_name = split_full_name(member.get("fullName"))
+        team.append((
+            last_name, first_name, middle_name,
+            member.get("faculty"), member.get("group"), member.get("phone"), member.get("email"),
+            member.get("keySkills"), member.get("role"),
+        ))
+
+    supervisor = None
+    if with_supervisor and payload.get("supervisor"):
+        s = payload["supervisor"]
+        supervisor = (s.get("fullName"), s.get("academicTitle"), s.get("position"), s.get("phone"), s.get("email"))
+
+    return {
+        "kind": kind,
+        "application": tuple(payload.get(field) for field in fields) + (
+            first_attachment.get("label"), first_attachment.get("url"), payload.get("additionalInfo"),
+        ),
+        "team": team,
+        "supervisor": supervisor,
+    }
+
+
+def application_hash(payload, kind):
+    """
+    sha256 содержимого заявки: повтор той же заявки дает тот же хэш.
+    Без Idempotency-Key он же — групповой sha256 (см. idempotency_key)
+    """
+    _, fields, with_supervisor = INTAKE_KINDS[kind]
+    canonical = {field: payload.get(field) for field in fields}
+    canonical.update({
+        "type": kind,
+        "team": payload.get("team") or [],
+        "attachments": payload.get("attachments") or [],
+        "additionalInfo": payload.get("additionalInfo"),
+    })
+    if with_supervisor:
+        canonical["supervisor"] = payload.get("supervisor") or {}
+    data = json.dumps(canonical, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def idempotency_key(kind, header, sha256):
+    """
+    Ключ повтора и групповой sha256 заявки: заголовок Idempotency-Key
+    (в пространстве вида заявки) или хэш содержимого
+    """
+    if header:
+        return hashlib.sha256(f"{kind}:{header}".encode("utf-8")).hexdigest()
+    return sha256
+
+
+def _values(columns, rows):
+    row = "(" + ",".join(["%s"] * len(columns)) + ")"
+    return ",".join([row] * len(rows))
+
+
+def _insert(table, columns, rows):
+    # Таблицы и колонки — константы модуля, поэтому SQL собирается строкой
+    return f'INSERT INTO "{table}" ({column_list(columns)}) VALUES ' + _values(columns, rows)
+
+
+def _statements(application, sha256):
+    """(таблица, колонки, строки) для всех частей заявки"""
+    table, fields, _ = INTAKE_KINDS[application["kind"]]
+    statements = [(table, fields + EXTRA_COLUMNS, [application["application"] + (sha256,)])]
+    if application["supervisor"]:
+        statements.append(("supervisor_2", SUPERVISOR_COLUMNS, [application["supervisor"] + (sha256,)]))
+    if application["team"]:
+        statements.append(("team", TEAM_COLUMNS, [member + (sha256,) for member in application["team"]]))
+    return statements
+
+
+def combined_insert(application, sha256, key, content_sha256=None):
+    """
+    Одна команда на всю заявку; части пишутся, только если ключ занят этой командой:
+    WITH claim AS (INSERT INTO intake_requests ... ON CONFLICT DO NOTHING RETURNING ...),
+         w0 AS (INSERT INTO answers SELECT ... WHERE EXISTS (SELECT 1 FROM claim)), ...
+    SELECT count(*) AS created FROM claim
+    """
+    ctes = [f"claim AS ({IDEMPOTENCY_CLAIM})"]
+    params = [key, application["kind"], sha256, content_sha256 or sha256]
+    for i, (table, columns, rows) in enumerate(_statements(application, sha256)):
+        ctes.append(
+            f'w{i} AS (INSERT INTO "{table}" ({column_list(columns)}) '
+            f"SELECT * FROM (VALUES {_values(columns, rows)}) AS v WHERE EXISTS (SELECT 1 FROM claim))"
+        )
+        params.extend(value for row in rows for value in row)
+    return f"WITH {', '.join(ctes)} SELECT count(*) AS created FROM claim", params
+
+
+def insert_statements(statements):
+    """
+    [(таблица, колонки, строки), ...] -> (SQL одной команды, параметры).
+    Пустые части пропускаются; если писать нечего — (None, [])
+    """
+    parts = []
+    params = []
+    for table, columns, rows in statements:
+        if not rows:
+            continue
+        parts.append(_insert(table, columns, rows))
+        params.extend(value for row in rows for value in row)
+    if not parts:
+        return None, []
+    query = parts[-1]
+    if len(parts) > 1:
+        ctes = ", ".join(f"w{i} AS ({part})" for i, part in enumerate(parts[:-1]))
+        query = f"WITH {ctes} {query}"
+    return query, params
+
+
+async def _write_by_parts(application, sha256, key, content_sha256=None):
+    """Запасной путь: части по очереди в одной транзакции, команда — с пропуском проблемных строк"""
+    async with transaction() as conn:
+        claimed = await execute_single_query(
+            IDEMPOTENCY_CLAIM, (key, application["kind"], sha256, content_sha256 or sha256), connection=conn
+        )
+        if claimed is None:
+            return False
+        for table, columns, rows in _statements(application, sha256):
+            if table != "team":
+                await bulk_insert(table, columns, rows, connection=conn)
+                continue
+            try:
+                async with savepoint(conn):
+                    await bulk_insert(table, columns, rows, connection=conn)
+            except Exception as e:
+                print(f"❌ Заявка {application['kind']}: пакетная вставка команды не удалась, сохраняем построчно: {e}")
+                for i, row in enumerate(rows):
+                    try:
+                        async with savepoint(conn):
+                            await bulk_insert(table, columns, [row], connection=conn)
+                    except Exception as e:
+                        print(f"❌ Заявка {application['kind']}: ошибка сохранения участника {i+1}: {e}")
+    return True
+
+
+async def write_application(application, sha256, key, content_sha256=None):
+    """
+    Записывает заявку одной командой: все части атомарно, один COMMIT.
+    Возвращает False, если ключ уже занят (повтор) и ничего не записано.
+    По частям пишем только при ошибке данных; сбои соединения и пула пробрасываются
+    """
+    query, params = combined_insert(application, sha256, key, content_sha256)
+    try:
+        result = await execute_single_query(query, params)
+        return bool(result and result["created"])
+    except (psycopg.DataError, psycopg.IntegrityError) as e:
+        print(f"❌ Заявка {application['kind']}: запись одной командой не удалась, пишем по частям: {e}")
+        return await _write_by_parts(application, sha256, key, content_sha256)
+
+
+async def submit_application(payload, kind, idempotency_header=None):
+    """
+    normalize -> hash -> write.
+    Возвращает (групповой sha256, replayed); для повтора — sha256 исходной заявки.
+    IdempotencyConflict — ключ уже занят заявкой с другим содержимым
+    """
+    application = normalize(payload, kind)
+    content_sha256 = application_hash(payload, kind)
+    key = idempotency_key(kind, idempotency_header, content_sha256)
+    if await write_application(application, key, key, content_sha256):
+        return key, False
+    original = await execute_single_query(
+        'SELECT "sha256", "content_sha256" FROM intake_requests WHERE "key" = %s', (key,)
+    )
+    if original is None:
+        return key, True
+    # content_sha256 пуст у записей журнала, созданных до его появления
+    if original["content_sha256"] and original["content_sha256"] != content_sha256:
+        raise IdempotencyConflict(key)
+    return original["sha256"], True
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Прием заявок /app/intake-unified в режиме "принять, потом обработать".
+
+При INTAKE_OUTBOX_ENABLED=true заявка не пишется в PostgreSQL в запросе:
+исходный JSON одной вставкой добавляется в локальный outbox (SQLite в WAL
+режиме на диске API), клиент сразу получает 202 с sha256 и адресом статуса.
+Сбой или медленная БД в дедлайн не превращается в 500 — заявка уже на диске.
+
+Фоновый обработчик в процессе API забирает заявки пачками и прогоняет их
+через обычный конвейер app.intake (идемпотентный, поэтому повторная
+обработка после сбоя не дает дублей). Недоступность БД (соединение, пул,
+таймаут) откладывает пачку с экспоненциальной паузой и попыткой не считается:
+outbox переживает простой любой длины. Попытки считаются только для ошибок
+самой заявки; после INTAKE_OUTBOX_MAX_ATTEMPTS она помечается failed и
+возвращается в очередь командой
+
+    python -m app.intake_outbox retry [sha256 ...]
+
+Обрабатывает один воркер на хост (flock), при его остановке работу
+подхватывает другой.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import psycopg
+from psycopg_pool import PoolTimeout
+
+from .config.async_database import execute_single_query
+from .intake import IdempotencyConflict, application_hash, idempotency_key, submit_application
+
+INTAKE_OUTBOX_ENABLED = os.getenv("INTAKE_OUTBOX_ENABLED", "false").lower() == "true"
+INTAKE_OUTBOX_PATH = os.getenv("INTAKE_OUTBOX_PATH") or str(
+    Path(__file__).resolve().parent.parent / "data" / "intake_outbox.sqlite3"
+)
+INTAKE_OUTBOX_BATCH = int(os.getenv("INTAKE_OUTBOX_BATCH", "50"))
+INTAKE_OUTBOX_POLL = float(os.getenv("INTAKE_OUTBOX_POLL", "2"))
+INTAKE_OUTBOX_MAX_ATTEMPTS = int(os.getenv("INTAKE_OUTBOX_MAX_ATTEMPTS", "20"))
+# Обработанные заявки хранятся в outbox столько дней (для статуса), затем удаляются
+INTAKE_OUTBOX_RETENTION_DAYS = float(os.getenv("INTAKE_OUTBOX_RETENTION_DAYS", "7"))
+RETRY_DELAY_MAX = 300
+
+# Ошибки недоступности БД: заявка не виновата, попытка не считается
+TRANSIENT_ERRORS = (psycopg.OperationalError, PoolTimeout, OSError, asyncio.TimeoutError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intake_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    content_sha256 TEXT,
+    payload TEXT NOT NULL,
+    idempotency_header TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_intake_outbox_pending ON intake_outbox(status, next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS ix_intake_outbox_sha256 ON intake_outbox(sha256);
+"""
+
+_worker = None
+_wakeup = None
+_leader_fd = None
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def init_outbox(path=INTAKE_OUTBOX_PATH):
+    """Создает файл и схему outbox (один раз на процесс, при старте)"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            # WAL хранится в файле базы: режим задается один раз
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # outbox, созданный до появления content_sha256
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(intake_outbox)")}
+            if "content_sha256" not in columns:
+                connection.execute("ALTER TABLE intake_outbox ADD COLUMN content_sha256 TEXT")
+        finally:
+            connection.close()
+        _schema_ready = True
+
+
+def _connect():
+    """
+    Соединение потока (asyncio.to_thread берет потоки из общего пула):
+    открывается один раз, дальше каждая операция — только свои команды
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        init_outbox()
+        connection = sqlite3.connect(INTAKE_OUTBOX_PATH, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        # synchronous=FULL: принятая заявка переживает падение процесса и хоста
+        connection.execute("PRAGMA synchronous=FULL")
+        _local.connection = connection
+    return connection
+
+
+def _enqueue(key, kind, sha256, content_sha256, payload, header):
+    connection = _connect()
+    connection.execute(
+        """
+        INSERT INTO intake_outbox (key, kind, sha256, content_sha256, payload, idempotency_header, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (key) DO NOTHING
+        """,
+        (key, kind, sha256, content_sha256, json.dumps(payload, ensure_ascii=False), header, time.time()),
+    )
+    row = connection.execute(
+        "SELECT sha256, status, content_sha256 FROM intake_outbox WHERE key = ?", (key,)
+    ).fetchone()
+    # Тот же ключ с другим содержимым — как в app.intake.submit_application
+    if row["content_sha256"] and row["content_sha256"] != content_sha256:
+        raise IdempotencyConflict(key)
+    return {"sha256": row["sha256"], "status": row["status"]}
+
+
+async def enqueue_application(payload, kind, idempotency_header=None):
+    """
+    Одна вставка в outbox; возвращает {"sha256", "status"}.
+    Повтор (тот же ключ идемпотентности) возвращает уже принятую заявку;
+    тот же ключ с другим содержимым — IdempotencyConflict
+    """
+    content_sha256 = application_hash(payload, kind)
+    key = idempotency_key(kind, idempotency_header, content_sha256)
+    # Групповой sha256 равен ключу (см. app.intake.submit_application)
+    accepted = await asyncio.to_thread(_enqueue, key, kind, key, content_sha256, payload, idempotency_header)
+    if _wakeup is not None:
+        _wakeup.set()
+    return accepted
+
+
+def _status(sha256):
+    row = _connect().execute(
+        """
+        SELECT sha256, status, attempts, last_error, created_at, processed_at
+        FROM intake_outbox WHERE sha256 = ? ORDER BY id DESC LIMIT 1
+        """,
+        (sha256,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+async def get_intake_status(sha256):
+    """Статус заявки: из outbox, иначе из журнала intake_requests (заявки, принятые без outbox)"""
+    status = await asyncio.to_thread(_status, sha256) if os.path.exists(INTAKE_OUTBOX_PATH) else None
+    if status is not None:
+        return status
+    row = await execute_single_query('SELECT "sha256" FROM intake_requests WHERE "sha256" = %s LIMIT 1', (sha256,))
+    return {"sha256": sha256, "status": "done"} if row else None
+
+
+def _claim_batch(limit):
+    rows = _connect().execute(
+        """
+        SELECT id, kind, payload, idempotency_header, attempts FROM intake_outbox
+        WHERE status = 'pending' AND next_attempt_at <= ?
+        ORDER BY id LIMIT ?
+        """,
+        (time.time(), limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _apply_batch(connection, done, failed, now):
+    connection.executemany(
+        "UPDATE intake_outbox SET status = 'done', processed_at = ?, last_error = NULL WHERE id = ?",
+        [(now, row_id) for row_id in done],
+    )
+    connection.executemany(
+        """
+        UPDATE intake_outbox
+        SET attempts = ?, last_error = ?, next_attempt_at = ?,
+            status = CASE WHEN ? >= ? THEN 'failed' ELSE 'pending' END
+        WHERE id = ?
+        """,
+        [
+            (attempts, error, now + min(2 ** attempts, RETRY_DELAY_MAX), attempts, INTAKE_OUTBOX_MAX_ATTEMPTS, row_id)
+            for row_id, attempts, error in failed
+        ],
+    )
+    connection.execute(
+        "DELETE FROM intake_outbox WHERE status = 'done' AND processed_at < ?",
+        (now - INTAKE_OUTBOX_RETENTION_DAYS * 86400,),
+    )
+
+
+def _finish_batch(done, failed):
+    """done: [id], failed: [(id, attempts, error)] — одной транзакцией SQLite"""
+    now = time.time()
+    connection = _connect()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        _apply_batch(connection, done, failed, now)
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def _retry_failed(sha256s):
+    """failed -> pending с обнуленными попытками; возвращает число заявок"""
+    query = """
+        UPDATE intake_outbox SET status = 'pending', attempts = 0, next_attempt_at = 0, last_error = NULL
+        WHERE status = 'failed'
+    """
+    params = ()
+    if sha256s:
+        query += f" AND sha256 IN ({','.join('?' * len(sha256s))})"
+        params = tuple(sha256s)
+    return _connect().execute(query, params).rowcount
+
+
+async def retry_failed(sha256s=None):
+    """Возвращает заявки failed (все или по sha256) в очередь"""
+    count = await asyncio.to_thread(_retry_failed, list(sha256s or ()))
+    if _wakeup is not None:
+        _wakeup.set()
+    return count
+
+
+async def drain_once(limit=INTAKE_OUTBOX_BATCH):
+    """Обрабатывает одну пачку; возвращает число обработанных заявок"""
+    batch = await asyncio.to_thread(_claim_batch, limit)
+    done, failed = [], []
+    unavailable = None
+    for row in batch:
+        try:
+            payload = json.loads(row["payload"])
+            # sha256 в outbox не меняется: по нему клиент спрашивает статус
+            await submit_application(payload, row["kind"], row["idempotency_header"])
+            done.append(row["id"])
+        except TRANSIENT_ERRORS as e:
+            # БД недоступна: попытка не считается, остаток пачки ждет следующего прохода
+            unavailable = e
+            break
+        except Exception as e:
+            print(f"❌ Outbox: заявка {row['id']} не записана (попытка {row['attempts'] + 1}): {e}")
+            failed.append((row["id"], row["attempts"] + 1, str(e)))
+    if done or failed:
+        await asyncio.to_thread(_finish_batch, done, failed)
+    if done:
+        print(f"✅ Outbox: записано заявок: {len(done)}")
+    if unavailable is not None:
+        # Пауза и повтор — в _drain_loop
+        raise unavailable
+    return len(done)
+
+
+def _is_leader(path=INTAKE_OUTBOX_PATH):
+    """Outbox разбирает один воркер на хост: тот, кто держит flock на .lock рядом с базой"""
+    global _leader_fd
+    if _leader_fd is not None:
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _leader_fd = fd
+    return True
+
+
+async def _drain_loop():
+    delay = INTAKE_OUTBOX_POLL
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        # Лидер может смениться, если его воркер остановился
+        if not _is_leader():
+            continue
+        try:
+            processed = await drain_once()
+            if processed == INTAKE_OUTBOX_BATCH:
+                # Пачка полная — сразу следующая
+                _wakeup.set()
+            delay = INTAKE_OUTBOX_POLL
+        except Exception as e:
+            print(f"❌ Outbox: ошибка обработки, повтор через {min(delay * 2, RETRY_DELAY_MAX):.0f} с: {e}")
+            delay = min(delay * 2, RETRY_DELAY_MAX)
+
+
+def start_intake_outbox():
+    """Запускает обработчик outbox (из lifespan)"""
+    global _worker, _wakeup
+    if not INTAKE_OUTBOX_ENABLED:
+        return
+    init_outbox()
+    _wakeup = asyncio.Event()
+    _wakeup.set()
+    _worker = asyncio.create_task(_drain_loop(), name="intake-outbox")
+
+
+async def stop_intake_outbox():
+    global _worker, _leader_fd
+    if _worker is not None:
+        _worker.cancel()
+        try:
+            await _worker
+        except asyncio.CancelledError:
+            pass
+        _worker = None
+    if _leader_fd is not None:
+        os.close(_leader_fd)
+        _leader_fd = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Outbox заявок /app/intake-unified")
+    commands = parser.add_subparsers(dest="command", required=True)
+    retry = commands.add_parser("retry", help="вернуть заявки failed в очередь")
+    retry.add_argument("sha256", nargs="*", help="sha256 заявок (по умолчанию все failed)")
+    args = parser.parse_args()
+    print(f"✅ Возвращено в очередь заявок: {asyncio.run(retry_failed(args.sha256))}")
@@ -3,6 +3,7 @@
 """
 
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -50,29 +51,51 @@ DEBUG = DEBUG.lower() == "true"
 from .api.faqs import router as faqs_router
 from .api.news import router as news_router
 from .api.partners import router as partners_router
+from .api.home import router as home_router
 from .api.application import router as application_router
 from .api.documents import router as documents_router
+from .config.database import close_pool, get_pool_stats
+from .config.async_database import init_async_pool, close_async_pool, get_async_pool_stats
+from .utils.instrumentation import get_query_stats
+from .utils.cache import get_cache_stats
+from .utils.content_events import start_content_listener, stop_content_listener
+from .utils.middleware import CharsetCompressionMiddleware
+from .snapshots import start_snapshot_publisher, stop_snapshot_publisher
+from .form_registry import start_form_registry
+from .intake_outbox import start_intake_outbox, stop_intake_outbox
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Открывает пул соединений и слушателя изменений контента, закрывает при остановке"""
+    # Синхронный пул (config.database) нужен только скриптам и открывается ими по требованию
+    await init_async_pool()
+    await start_form_registry()
+    content_listener = start_content_listener()
+    start_snapshot_publisher()
+    start_intake_outbox()
+    try:
+        yield
+    finally:
+        await stop_intake_outbox()
+        await stop_snapshot_publisher()
+        await stop_content_listener(content_listener)
+        await close_async_pool()
+        # Если кто-то все же открыл синхронный пул
+        close_pool()
+
 
 # Создаем экземпляр FastAPI
 app = FastAPI(
     title=PROJECT_NAME,
     description=PROJECT_DESCRIPTION,
     version=PROJECT_VERSION,
-    debug=DEBUG
+    debug=DEBUG,
+    lifespan=lifespan
 )
 
-# Добавляем middleware для правильной кодировки
-@app.middleware("http")
-async def add_charset_middleware(request, call_next):
-    response = await call_next(request)
-    
-    # Не изменяем Content-Type для системных endpoints FastAPI
-    if not request.url.path.startswith(('/docs', '/redoc', '/openapi.json')):
-        # Проверяем, что это действительно JSON ответ
-        if "application/json" in response.headers.get("content-type", ""):
-            response.headers["Content-Type"] = "application/json; charset=utf-8"
-    
-    return response
+# charset=utf-8 для JSON и сжатие br/gzip (чистый ASGI, без BaseHTTPMiddleware)
+app.add_middleware(CharsetCompressionMiddleware)
 
 # Настройка CORS
 app.add_middleware(
@@ -87,6 +110,7 @@ app.add_middleware(
 app.include_router(faqs_router)
 app.include_router(news_router)
 app.include_router(partners_router)
+app.include_router(home_router)
 app.include_router(application_router, prefix="/api")
 app.include_router(documents_router)
 
@@ -148,7 +172,9 @@ async def health_check():
             "project_name": PROJECT_NAME,
             "version": PROJECT_VERSION,
             "environment": ENVIRONMENT
-        }
+        },
+        "database_pool": get_pool_stats(),
+        "database_async_pool": get_async_pool_stats()
     }
 
 @app.get("/config")
@@ -173,3 +199,23 @@ async def get_config():
         },
         "environment": os.getenv("ENVIRONMENT")
     }
+
+@app.get("/metrics/db")
+async def get_db_metrics(top: int = 20):
+    """Статистика пулов и SQL запросов (только для разработки)"""
+    if not DEBUG:
+        return {"message": "Метрики скрыты в продакшене"}
+
+    return {
+        "pool": get_pool_stats(),
+        "async_pool": get_async_pool_stats(),
+        "queries": get_query_stats(top)
+    }
+
+@app.get("/metrics/cache")
+async def get_cache_metrics():
+    """Статистика кэша контента: попадания/промахи, размер (только для разработки)"""
+    if not DEBUG:
+        return {"message": "Метрики скрыты в продакшене"}
+
+    return get_cache_stats()
@@ -0,0 +1,118 @@
+"""
+Типизированные строки ответов контентных эндпоинтов (новости, FAQ, партнеры).
+
+TypedDict описывает форму строки для статической проверки и ничего не стоит
+во время выполнения; конвертеры строят все строки ответа одним проходом по
+результату запроса, с заранее вычисленным базовым URL медиа. Результат — обычные
+словари: orjson сериализует их быстрее, чем dataclass или pydantic объекты
+(см. scripts/bench_serialization.py). Исходные строки не изменяются, поэтому
+кэшированные результаты CRUD остаются нетронутыми.
+Порядок полей совпадает с прежними ответами, поэтому JSON не меняется.
+"""
+
+import os
+from datetime import datetime
+from typing import Optional, TypedDict
+
+# Базовый URL медиа читается один раз, а не из окружения на каждую строку
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "http://bsuir.stacklevel.group/media/")
+# Логотипы партнеров отдаются относительным путем (как и раньше)
+PARTNER_LOGO_PREFIX = "/media/"
+
+
+def media_url(path: Optional[str]) -> Optional[str]:
+    """Путь к изображению -> полный URL (полные URL возвращаются как есть)"""
+    if not path:
+        return None
+    if path.startswith("http"):
+        return path
+    return MEDIA_BASE_URL + path
+
+
+class NewsRow(TypedDict):
+    id: int
+    title: str
+    content: str
+    image: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    imageUrl: Optional[str]
+
+
+class NewsPageRow(TypedDict):
+    id: int
+    title: str
+    image: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    excerpt: Optional[str]
+    imageUrl: Optional[str]
+
+
+class FAQRow(TypedDict):
+    id: int
+    question: str
+    answer: str
+    order: int
+    is_active: bool
+    image: Optional[str]
+    created_at: Optional[datetime]
+    imageUrl: Optional[str]
+
+
+class PartnerRow(TypedDict):
+    name: str
+    title: Optional[str]
+    description: Optional[str]
+    website: Optional[str]
+    is_active: bool
+    id: int
+    logoUrl: Optional[str]
+    created_at: Optional[datetime]
+
+
+def news_rows(rows) -> list[NewsRow]:
+    return [
+        {
+            "id": row["id"], "title": row["title"], "content": row["content"], "image": row["image"],
+            "is_active": row["is_active"], "created_at": row["created_at"], "updated_at": row["updated_at"],
+            "imageUrl": media_url(row["image"]),
+        }
+        for row in rows
+    ]
+
+
+def news_page_rows(rows) -> list[NewsPageRow]:
+    return [
+        {
+            "id": row["id"], "title": row["title"], "image": row["image"], "is_active": row["is_active"],
+            "created_at": row["created_at"], "updated_at": row["updated_at"], "excerpt": row["excerpt"],
+            "imageUrl": media_url(row["image"]),
+        }
+        for row in rows
+    ]
+
+
+def faq_rows(rows) -> list[FAQRow]:
+    return [
+        {
+            "id": row["id"], "question": row["question"], "answer": row["answer"], "order": row["order"],
+            "is_active": row["is_active"], "image": row["image"], "created_at": row["created_at"],
+            "imageUrl": media_url(row["image"]),
+        }
+        for row in rows
+    ]
+
+
+def partner_rows(rows) -> list[PartnerRow]:
+    return [
+        {
+            "name": row["name"], "title": row["title"], "description": row["description"],
+            "website": row["website"], "is_active": row["is_active"], "id": row["id"],
+            "logoUrl": PARTNER_LOGO_PREFIX + row["logo"] if row["logo"] else None,
+            "created_at": row["created_at"],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Публикация статических JSON снимков публичного контента.
+
+Точные тела ответов GET /news/, /news/{id}, /faqs/, /partners и /home (те же байты,
+что отдает API) записываются в версионированный каталог под media вместе с
+.gz и .br копиями; ссылка current атомарно переключается на новую версию:
+
+    media/snapshots/
+        current -> 20250101120000-1a2b3c4d
+        20250101120000-1a2b3c4d/
+            manifest.json
+            news/index.json(.gz, .br)
+            news/12.json(.gz, .br)
+            faqs/index.json(.gz, .br)
+            partners/index.json(.gz, .br)
+            home/index.json(.gz, .br)
+
+nginx отдает файлы напрямую (см. nginx_conf.txt), эндпоинты FastAPI остаются
+запасным путем. Снимок переиздается после каждого изменения в админке (NOTIFY,
+см. utils/content_events.py) одним воркером на хост.
+
+Ручная публикация:
+
+    python -m app.snapshots
+"""
+
+import argparse
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from .api.faqs import faqs_payload
+from .api.home import home_representation
+from .api.news import news_payload, news_item_payload
+from .api.partners import partners_payload
+from .config.async_database import execute_single_query, init_async_pool, close_async_pool
+from .utils.content_events import on_content_changed
+from .utils.http_cache import get_representation
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - без brotli публикуются только .json и .gz
+    brotli = None
+
+CONTENT_SNAPSHOT_ENABLED = os.getenv("CONTENT_SNAPSHOT_ENABLED", "false").lower() == "true"
+CONTENT_SNAPSHOT_DIR = os.getenv("CONTENT_SNAPSHOT_DIR") or str(
+    Path(__file__).resolve().parent.parent / "media" / "snapshots"
+)
+CONTENT_SNAPSHOT_KEEP = int(os.getenv("CONTENT_SNAPSHOT_KEEP", "3"))
+# Пауза перед публикацией: серия сохранений в админке дает одну публикацию
+CONTENT_SNAPSHOT_DELAY = float(os.getenv("CONTENT_SNAPSHOT_DELAY", "1"))
+
+CURRENT_LINK = "current"
+MANIFEST = "manifest.json"
+
+_pending = None
+_dirty = False
+_leader_fd = None
+
+
+async def render_snapshot():
+    """{относительный путь: тело ответа} для всех публикуемых адресов"""
+    # Недоступная БД не должна превратиться в опубликованные пустые списки
+    await execute_single_query("SELECT 1")
+
+    files = {}
+    news = await news_payload()
+    files["news/index.json"] = (await get_representation(("news", "response"), news_payload)).body
+    for item in news:
+        news_id = item["id"]
+        representation = await get_representation(
+            ("news", "response", news_id), lambda news_id=news_id: news_item_payload(news_id), dated=True
+        )
+        files[f"news/{news_id}.json"] = representation.body
+    files["faqs/index.json"] = (await get_representation(("faqs", "response"), faqs_payload)).body
+    files["partners/index.json"] = (
+        await get_representation(("partners", "response"), partners_payload)
+    ).body
+    files["home/index.json"] = (await home_representation()).body
+    return files
+
+
+def _content_hash(files):
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(files):
+        digest.update(path.encode("utf-8"))
+        digest.update(files[path])
+    return digest.hexdigest()
+
+
+def _current_manifest(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_LINK, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(files, directory=CONTENT_SNAPSHOT_DIR, keep=CONTENT_SNAPSHOT_KEEP):
+    """
+    Записывает новую версию и переключает на нее current.
+    Если содержимое не изменилось, возвращает текущую версию без записи
+    """
+    content_hash = _content_hash(files)
+    current = _current_manifest(directory)
+    if current and current.get("hash") == content_hash:
+        return current["version"]
+
+    version = f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{content_hash}"
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = os.path.join(directory, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    manifest = {
+        "version": version,
+        "hash": content_hash,
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {},
+    }
+    for path, body in files.items():
+        target = os.path.join(tmp_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(body)
+        # mtime=0: одинаковое содержимое дает одинаковые .gz
+        with open(target + ".gz", "wb") as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + ".br", "wb") as f:
+                f.write(brotli.compress(body, quality=11))
+        manifest["files"][path] = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    os.replace(tmp_dir, os.path.join(directory, version))
+    # Атомарное переключение: nginx видит либо старую, либо новую версию целиком
+    tmp_link = os.path.join(directory, f".{CURRENT_LINK}.tmp")
+    if os.path.lexists(tmp_link):
+        os.unlink(tmp_link)
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, os.path.join(directory, CURRENT_LINK))
+
+    _prune(directory, keep, version)
+    return version
+
+
+def _prune(directory, keep, current_version):
+    """Удаляет старые версии, оставляя keep последних (текущая не удаляется никогда)"""
+    versions = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".")
+    )
+    for name in versions[:-keep] if keep > 0 else []:
+        if name != current_version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+async def publish_snapshots(directory=CONTENT_SNAPSHOT_DIR):
+    """Рендерит и публикует снимок; возвращает версию"""
+    started = time.perf_counter()
+    files = await render_snapshot()
+    version = await asyncio.to_thread(write_snapshot, files, directory)
+    print(f"✅ Снимок контента {version}: {len(files)} файлов за {time.perf_counter() - started:.2f} с")
+    return version
+
+
+def _is_leader(directory=CONTENT_SNAPSHOT_DIR):
+    """Публикует один воркер на хост: тот, кто держит flock на .publisher.lock"""
+    global _leader_fd
+    if _leader_fd is not None:
+        return True
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, ".publisher.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _leader_fd = fd
+    return True
+
+
+async def _publish_loop():
+    global _dirty
+    # Изменения, пришедшие во время публикации, дают еще один проход
+    while _dirty:
+        await asyncio.sleep(CONTENT_SNAPSHOT_DELAY)
+        _dirty = False
+        try:
+            await publish_snapshots()
+        except Exception as e:
+            print(f"❌ Ошибка публикации снимка контента: {e}")
+
+
+def schedule_publish(resource=None, object_id=None):
+    """Обработчик изменений контента: отложенная публикация без дублей"""
+    global _pending, _dirty
+    # Формы и прочие ресурсы в снимок не входят
+    if resource not in (None, "news", "faqs", "partners"):
+        return
+    if not _is_leader():
+        return
+    _dirty = True
+    if _pending is None or _pending.done():
+        _pending = asyncio.create_task(_publish_loop(), name="content-snapshot")
+
+
+def start_snapshot_publisher():
+    """Подписывает публикатор на изменения контента и публикует начальный снимок (из lifespan)"""
+    if not CONTENT_SNAPSHOT_ENABLED:
+        return
+    on_content_changed(schedule_publish)
+    schedule_publish()
+
+
+async def stop_snapshot_publisher():
+    global _pending, _leader_fd
+    if _pending is not None:
+        _pending.cancel()
+        try:
+            await _pending
+        except asyncio.CancelledError:
+            pass
+        _pending = None
+    if _leader_fd is not None:
+        os.close(_leader_fd)
+        _leader_fd = None
+
+
+async def _main(directory):
+    await init_async_pool()
+    try:
+        return await publish_snapshots(directory)
+    finally:
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Публикация статических JSON снимков контента")
+    parser.add_argument("--dir", default=CONTENT_SNAPSHOT_DIR, help="каталог снимков")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dir))
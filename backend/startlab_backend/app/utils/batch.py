@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Пакетная выборка по ?ids=1,2,3: один запрос WHERE id = ANY(%s) вместо N запросов по id
+"""
+
+BATCH_IDS_MAX = 100
+
+
+def parse_ids(raw, max_count=BATCH_IDS_MAX):
+    """"3,1,3" -> (3, 1): уникальные id в порядке запроса; ValueError для мусора"""
+    ids = []
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid id: {part}") from None
+        if value <= 0:
+            raise ValueError(f"Invalid id: {part}")
+        if value not in ids:
+            ids.append(value)
+    if not ids:
+        raise ValueError("ids is empty")
+    if len(ids) > max_count:
+        raise ValueError(f"Too many ids: {len(ids)} (max {max_count})")
+    return tuple(ids)
+
+
+def order_by_ids(rows, ids):
+    """Строки в порядке ids и список id, которых нет (или они неактивны)"""
+    by_id = {row["id"]: row for row in rows}
+    items = [by_id[row_id] for row_id in ids if row_id in by_id]
+    missing = [row_id for row_id in ids if row_id not in by_id]
+    return items, missing
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Процессный кэш контента (FAQ / новости / партнеры) с TTL,
+ограничением размера и явной инвалидацией.
+
+Промахи обрабатываются по принципу single-flight: на один ключ в процессе
+выполняется одна перестройка, остальные запросы ждут ее результат.
+Истекшая запись еще CONTENT_CACHE_STALE_TTL секунд отдается как есть,
+пока обновление идет в фоне (stale-while-revalidate).
+
+CONTENT_CACHE_BACKEND=shared включает общий для воркеров кэш в tmpfs
+(см. shared_cache.py): N воркеров — одна перестройка и одна копия данных.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import wraps
+
+CONTENT_CACHE_TTL = float(os.getenv("CONTENT_CACHE_TTL", "60"))
+CONTENT_CACHE_MAXSIZE = int(os.getenv("CONTENT_CACHE_MAXSIZE", "256"))
+CONTENT_CACHE_STALE_TTL = float(os.getenv("CONTENT_CACHE_STALE_TTL", "30"))
+# memory — кэш в каждом процессе; shared — файлы в CONTENT_CACHE_DIR (по умолчанию /dev/shm)
+CONTENT_CACHE_BACKEND = os.getenv("CONTENT_CACHE_BACKEND", "memory").lower()
+CONTENT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU-кэш с временем жизни записей.
+    Ключи — кортежи, первый элемент которых — ресурс ("news", "faqs", ...),
+    что позволяет сбрасывать все записи ресурса одним вызовом.
+    """
+
+    shared = False
+
+    def __init__(self, name, ttl, maxsize, stale_ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        # Поколения растут при инвалидации: перестройка, начатая до нее, не запишет старые данные
+        self._generation = 0
+        self._resource_generations = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def lookup(self, key):
+        """
+        (value, fresh): fresh=False для истекшей записи в окне stale_ttl.
+        При отсутствии записи value — _MISSING
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] + self.stale_ttl <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self._stats["misses"] += 1
+                return _MISSING, False
+            self._data.move_to_end(key)
+            if entry[0] <= now:
+                self._stats["stale_hits"] += 1
+                return entry[1], False
+            self._stats["hits"] += 1
+            return entry[1], True
+
+    def get(self, key, default=None):
+        """Только свежие записи"""
+        value, fresh = self.lookup(key)
+        return value if fresh else default
+
+    def generation(self, resource):
+        with self._lock:
+            return self._generation, self._resource_generations.get(resource, 0)
+
+    def set(self, key, value, ttl=None, generation=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != (
+                self._generation, self._resource_generations.get(key[0], 0)
+            ):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    @asynccontextmanager
+    async def build_lock(self, key):
+        # В пределах процесса перестройки уже объединены через _inflight
+        yield
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._stats["invalidations"] += 1
+
+    def invalidate_resource(self, resource):
+        """Удаляет все записи ресурса (ключи вида (resource, ...))"""
+        with self._lock:
+            self._resource_generations[resource] = self._resource_generations.get(resource, 0) + 1
+            keys = [key for key in self._data if key[0] == resource]
+            for key in keys:
+                del self._data[key]
+            self._stats["invalidations"] += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "name": self.name,
+                "backend": "memory",
+                "ttl": self.ttl,
+                "maxsize": self.maxsize,
+                "stale_ttl": self.stale_ttl,
+                "size": len(self._data),
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                **self._stats,
+            }
+
+
+def _create_content_cache():
+    if CONTENT_CACHE_BACKEND == "shared":
+        from .shared_cache import SharedFileCache
+        return SharedFileCache(
+            "content",
+            ttl=CONTENT_CACHE_TTL,
+            maxsize=CONTENT_CACHE_MAXSIZE,
+            stale_ttl=CONTENT_CACHE_STALE_TTL,
+            directory=CONTENT_CACHE_DIR,
+        )
+    if CONTENT_CACHE_BACKEND != "memory":
+        print(f"⚠️ Неизвестный CONTENT_CACHE_BACKEND={CONTENT_CACHE_BACKEND}, используется memory")
+    return TTLCache(
+        "content",
+        ttl=CONTENT_CACHE_TTL,
+        maxsize=CONTENT_CACHE_MAXSIZE,
+        stale_ttl=CONTENT_CACHE_STALE_TTL,
+    )
+
+
+content_cache = _create_content_cache()
+
+# Текущие перестройки: (ключ, поколение) -> asyncio.Task
+_inflight = {}
+
+
+async def _build_and_store(cache, key, build, generation):
+    async with cache.build_lock(key):
+        if cache.shared:
+            # Пока ждали блокировку, другой воркер мог уже перестроить ключ
+            value, fresh = cache.lookup(key)
+            if fresh:
+                return value
+        value = await build()
+        # Пустые результаты (нет данных или ошибка БД) не кэшируются
+        if value:
+            cache.set(key, value, generation=generation)
+        return value
+
+
+def _start_build(cache, key, build, background=False):
+    generation = cache.generation(key[0])
+    flight = (key, generation)
+    task = _inflight.get(flight)
+    if task is None:
+        task = asyncio.ensure_future(_build_and_store(cache, key, build, generation))
+        _inflight[flight] = task
+
+        def _done(finished):
+            _inflight.pop(flight, None)
+            # Помечаем исключение полученным, даже если все ожидающие запросы отменены
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(_done)
+        if background:
+            task.add_done_callback(_log_refresh_error(key))
+    return task
+
+
+def _log_refresh_error(key):
+    def callback(task):
+        # Ошибку фонового обновления некому получить — логируем, устаревшее значение остается
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Ошибка при обновлении кэша {key}: {task.exception()}")
+    return callback
+
+
+async def get_or_build(key, build, cache=content_cache):
+    """
+    Значение из кэша по ключу (resource, ...) либо результат await build().
+    Параллельные промахи по одному ключу ждут одну перестройку;
+    устаревшая запись отдается сразу, а обновление запускается в фоне
+    """
+    value, fresh = cache.lookup(key)
+    if value is not _MISSING:
+        if not fresh:
+            _start_build(cache, key, build, background=True)
+        return value
+    # shield: отмена одного ожидающего запроса не отменяет общую перестройку
+    return await asyncio.shield(_start_build(cache, key, build))
+
+
+def cached_content(resource):
+    """
+    Декоратор для async CRUD функций: результат кэшируется по (resource, *args).
+    Пустые результаты (нет данных или ошибка БД) не кэшируются.
+    Возвращаемые объекты общие для всех запросов — изменять их можно только идемпотентно.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args):
+            return await get_or_build((resource, func.__name__, *args), lambda: func(*args))
+        return wrapper
+    return decorator
+
+
+# Составные ресурсы: источник -> ресурсы, собранные из него (например "news" -> {"home"})
+_dependents = {}
+
+
+def register_dependent(resource, *sources):
+    """Ресурс resource сбрасывается вместе с любым из sources"""
+    for source in sources:
+        _dependents.setdefault(source, set()).add(resource)
+
+
+def invalidate_content(resource=None):
+    """Сбрасывает кэш ресурса ("news", "faqs", "partners") и зависящих от него, или весь кэш контента"""
+    if resource is None:
+        content_cache.clear()
+    else:
+        content_cache.invalidate_resource(resource)
+        for dependent in _dependents.get(resource, ()):
+            content_cache.invalidate_resource(dependent)
+
+
+def get_cache_stats():
+    return {**content_cache.stats(), "inflight": len(_inflight)}
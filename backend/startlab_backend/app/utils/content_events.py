@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Межпроцессная инвалидация кэша контента через PostgreSQL LISTEN/NOTIFY.
+
+Django админка (admin_panel/signals.py) после сохранения/удаления партнера,
+FAQ, новости или формы шлет NOTIFY в канал CONTENT_NOTIFY_CHANNEL с JSON вида
+{"resource": "news", "id": 5, "action": "save"}. Каждый воркер uvicorn держит
+одно выделенное соединение с LISTEN и сбрасывает записи своего кэша.
+
+Полуоткрытое соединение (NAT/балансировщик сбросил простаивающее, failover
+БД без RST) уведомлений не приносит и ошибкой не заканчивается: поэтому
+каждые CONTENT_NOTIFY_PING_INTERVAL секунд без уведомлений выполняется
+SELECT 1, а на соединении включены TCP keepalive. Неответивший ping —
+переподключение с полным сбросом кэша.
+"""
+
+import asyncio
+import json
+import os
+
+import psycopg
+from psycopg import sql
+
+from ..config.async_database import get_conninfo
+from .cache import invalidate_content
+
+CONTENT_NOTIFY_CHANNEL = os.getenv("CONTENT_NOTIFY_CHANNEL", "content_changed")
+CONTENT_NOTIFY_ENABLED = os.getenv("CONTENT_NOTIFY_ENABLED", "true").lower() == "true"
+CONTENT_NOTIFY_PING_INTERVAL = float(os.getenv("CONTENT_NOTIFY_PING_INTERVAL", "30"))
+RECONNECT_DELAY_MAX = 30
+# libpq: обрыв без RST обнаруживается ядром примерно за idle + interval * count секунд
+LISTEN_KEEPALIVES = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+# Подписчики на изменения контента: fn(resource, object_id)
+_listeners = []
+
+
+def on_content_changed(callback):
+    """Регистрирует дополнительный обработчик изменений контента"""
+    _listeners.append(callback)
+    return callback
+
+
+def handle_content_notification(payload):
+    """Разбирает payload уведомления и сбрасывает кэш"""
+    try:
+        event = json.loads(payload)
+        resource = event.get("resource")
+        object_id = event.get("id")
+    except (TypeError, ValueError, AttributeError):
+        resource, object_id = None, None
+
+    # Неизвестный формат — безопаснее сбросить весь кэш контента
+    invalidate_content(resource)
+    for callback in _listeners:
+        try:
+            callback(resource, object_id)
+        except Exception as e:
+            print(f"❌ Ошибка обработчика изменений контента: {e}")
+
+
+async def listen_for_content_changes():
+    """Фоновая задача: LISTEN с переподключением при обрыве соединения"""
+    delay = 1
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(
+                get_conninfo(), autocommit=True, **LISTEN_KEEPALIVES
+            ) as connection:
+                await connection.execute(sql.SQL("LISTEN {}").format(sql.Identifier(CONTENT_NOTIFY_CHANNEL)))
+                # Пока соединения не было, уведомления могли потеряться:
+                # сбрасываем все, включая подписчиков (реестр форм, снимки)
+                handle_content_notification(None)
+                delay = 1
+                while True:
+                    async for notification in connection.notifies(timeout=CONTENT_NOTIFY_PING_INTERVAL):
+                        handle_content_notification(notification.payload)
+                    # Проверка соединения: зависший ping — такой же обрыв
+                    await asyncio.wait_for(connection.execute("SELECT 1"), timeout=CONTENT_NOTIFY_PING_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ LISTEN {CONTENT_NOTIFY_CHANNEL}: {e!r}; переподключение через {delay} с")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+
+def start_content_listener():
+    """Запускает слушателя (из lifespan FastAPI); возвращает задачу или None"""
+    if not CONTENT_NOTIFY_ENABLED:
+        return None
+    return asyncio.create_task(listen_for_content_changes(), name="content-listener")
+
+
+async def stop_content_listener(task):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
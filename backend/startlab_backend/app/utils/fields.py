@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Разреженные наборы полей (?fields=id,title) для контентных эндпоинтов.
+Поля проверяются по whitelist роутера и превращаются в список колонок SQL
+"""
+
+
+def parse_fields(raw, allowed):
+    """
+    "title,id" -> ("id", "title"): порядок whitelist, чтобы одинаковые наборы
+    давали один ключ кэша. ValueError для пустого набора или неизвестных полей
+    """
+    requested = {field.strip() for field in raw.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if not requested or unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown)) or '(empty)'}; allowed: {', '.join(allowed)}"
+        )
+    return tuple(field for field in allowed if field in requested)
+
+
+def columns_for(fields, derived=None):
+    """
+    Колонки SQL для полей ответа. derived — вычисляемые поля и их исходные
+    колонки, например {"imageUrl": ("image",)}
+    """
+    derived = derived or {}
+    columns = []
+    for field in fields:
+        for column in derived.get(field, (field,)):
+            if column not in columns:
+                columns.append(column)
+    return tuple(columns)
+
+
+def column_list(columns):
+    """SQL список колонок; имена только из whitelist, поэтому просто экранируются кавычками"""
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def project(row, fields):
+    """Только запрошенные поля строки, в порядке fields"""
+    return {field: row.get(field) for field in fields}
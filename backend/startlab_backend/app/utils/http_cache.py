@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Условные GET запросы для контентных эндпоинтов: ETag / Last-Modified / 304.
+
+Тело ответа сериализуется один раз при промахе кэша и хранится вместе с
+валидаторами, поэтому повторные запросы (в т.ч. ревалидации nginx) не
+выполняют ни запросов к БД, ни сериализации.
+
+Ответы помечаются Cache-Control, чтобы прокси (nginx proxy_cache) отдавал
+их сам; админка сбрасывает кэш nginx по префиксу адреса ресурса при
+сохранении (django_admin/admin_panel/signals.py, nginx_conf.txt).
+Surrogate-Key ("news news-12") — для CDN со сбросом по тегам; nginx его не использует.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .cache import get_or_build
+
+try:
+    # Быстрый кодировщик: datetime/UUID сериализуются нативно, без jsonable_encoder
+    import orjson
+except ImportError:  # pragma: no cover - без orjson работает стандартный json
+    orjson = None
+
+# Время жизни ответа в прокси/браузере и окно, когда прокси может отдать устаревший ответ,
+# обновляя его в фоне
+CONTENT_CACHE_MAX_AGE = int(os.getenv("CONTENT_CACHE_MAX_AGE", "60"))
+CONTENT_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("CONTENT_CACHE_STALE_WHILE_REVALIDATE", "300"))
+
+# ETag представлений начинается с "r-": по нему middleware сжатия отличает хэш тела
+# от ETag StaticFiles (mtime + размер), который не гарантирует одинаковое содержимое
+REPRESENTATION_ETAG_PREFIX = '"r-'
+
+CACHE_CONTROL = (
+    f"public, max-age={CONTENT_CACHE_MAX_AGE}, "
+    f"stale-while-revalidate={CONTENT_CACHE_STALE_WHILE_REVALIDATE}"
+)
+
+
+class Representation:
+    """Готовое JSON-представление ответа с валидаторами"""
+
+    __slots__ = ("body", "etag", "last_modified", "surrogate_key")
+
+    def __init__(self, body, etag, last_modified=None, surrogate_key=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.surrogate_key = surrogate_key
+
+
+def _as_utc(value):
+    if not isinstance(value, datetime):
+        return None
+    # TIMESTAMP без зоны Django пишет в UTC (USE_TZ = True)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def last_modified_of(payload):
+    """
+    updated_at одной строки (auto_now: меняется при каждом сохранении).
+    Для списков дату не вывести из строк: удаление или скрытие самой новой
+    строки сдвигает максимум назад, а у faqs и partners нет updated_at —
+    такие ответы валидируются только по ETag
+    """
+    if not isinstance(payload, dict):
+        return None
+    return _as_utc(payload.get("updated_at"))
+
+
+def _isoformat_utc_z(value):
+    text = value.isoformat()
+    # UTC как "Z" — так же, как pydantic сериализовал partners.created_at (TIMESTAMPTZ)
+    if value.utcoffset() is not None and not value.utcoffset():
+        return text.removesuffix("+00:00") + "Z"
+    return text
+
+
+def encode_json(payload):
+    """
+    Сериализация в байты UTF-8 (тот же компактный формат, что у JSONResponse FastAPI).
+    orjson, если установлен; иначе json через jsonable_encoder.
+    datetime в UTC пишется с "Z", как в pydantic; без зоны — без суффикса
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        jsonable_encoder(payload, custom_encoder={datetime: _isoformat_utc_z}),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def surrogate_key(key):
+    """
+    Ключи прокси для ключа кэша: ("news", "response") -> "news",
+    ("news", "response", 12) -> "news news-12"
+    """
+    resource = key[0]
+    if len(key) == 3 and isinstance(key[2], int):
+        return f"{resource} {resource}-{key[2]}"
+    return resource
+
+
+def make_representation(payload, surrogate_key=None, dated=False):
+    """dated=True — payload одна строка, чей updated_at доказывает дату (Last-Modified)"""
+    body = encode_json(payload)
+    etag = REPRESENTATION_ETAG_PREFIX + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    last_modified = last_modified_of(payload) if dated else None
+    return Representation(body, etag, last_modified, surrogate_key)
+
+
+class _Uncached:
+    """Обертка пустого ответа: ложна, поэтому get_or_build ее не кэширует"""
+
+    __slots__ = ("representation",)
+
+    def __init__(self, representation):
+        self.representation = representation
+
+    def __bool__(self):
+        return False
+
+
+async def get_representation(key, build, is_empty=None, dated=False):
+    """
+    Представление из кэша контента по ключу (resource, ...) либо построенное
+    через await build() (single-flight, stale-while-revalidate — см. cache.get_or_build).
+    Пустые ответы (ложные или is_empty(payload)) не кэшируются, как в cached_content:
+    это может быть ошибка БД, которую CRUD превратил в пустой список.
+    """
+    async def build_representation():
+        payload = await build()
+        representation = make_representation(payload, surrogate_key(key), dated)
+        if not payload or (is_empty is not None and is_empty(payload)):
+            return _Uncached(representation)
+        return representation
+
+    representation = await get_or_build(key, build_representation)
+    if isinstance(representation, _Uncached):
+        return representation.representation
+    return representation
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Слабое сравнение (RFC 9110): W/"x" совпадает с "x"
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(header, last_modified):
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    since = _as_utc(since)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(request: Request, representation: Representation) -> Response:
+    """
+    200 с телом и валидаторами либо 304 без тела.
+    If-Modified-Since проверяется только для ответов с Last-Modified (dated)
+    """
+    headers = {"ETag": representation.etag, "Cache-Control": CACHE_CONTROL}
+    if representation.surrogate_key:
+        headers["Surrogate-Key"] = representation.surrogate_key
+    if representation.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(representation.last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, representation.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(
+            if_modified_since, representation.last_modified
+        )
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=representation.body, media_type="application/json", headers=headers)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Инструментирование SQL запросов: время, число строк, отпечаток запроса,
+лог медленных запросов и выборочное логирование.
+
+На горячем пути только замер времени и обновление счетчиков — строки
+результата никогда не форматируются, поэтому стоимость не зависит от объема данных.
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+# Порог медленного запроса (мс) и доля запросов, которые логируются целиком (0..1)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_QUERY_LOG_SAMPLE_RATE = float(os.getenv("DB_QUERY_LOG_SAMPLE_RATE", "0"))
+DB_QUERY_STATS_LIMIT = int(os.getenv("DB_QUERY_STATS_LIMIT", "500"))
+
+logger = logging.getLogger("startlab.db")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "info").upper())
+    logger.propagate = False
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"(?:%s|\?)(?:\s*,\s*(?:%s|\?))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query) -> str:
+    """Нормализованный текст запроса: без литералов, лишних пробелов и длинных списков плейсхолдеров"""
+    text = str(query)
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _PLACEHOLDERS.sub("?, ...", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryStats:
+    """Агрегированная статистика по отпечаткам запросов"""
+
+    def __init__(self, limit=DB_QUERY_STATS_LIMIT):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._by_fingerprint = {}
+
+    def record(self, key, duration_ms, rows, error):
+        with self._lock:
+            entry = self._by_fingerprint.get(key)
+            if entry is None:
+                if len(self._by_fingerprint) >= self.limit:
+                    return
+                entry = self._by_fingerprint[key] = {
+                    "calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0, "slow": 0,
+                }
+            entry["calls"] += 1
+            entry["rows"] += rows or 0
+            entry["total_ms"] += duration_ms
+            if duration_ms > entry["max_ms"]:
+                entry["max_ms"] = duration_ms
+            if duration_ms >= DB_SLOW_QUERY_MS:
+                entry["slow"] += 1
+            if error:
+                entry["errors"] += 1
+
+    def snapshot(self, top=20):
+        with self._lock:
+            items = [(key, dict(value)) for key, value in self._by_fingerprint.items()]
+        items.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+        result = []
+        for key, value in items[:top]:
+            value["query"] = key
+            value["avg_ms"] = round(value["total_ms"] / value["calls"], 3) if value["calls"] else 0.0
+            value["total_ms"] = round(value["total_ms"], 3)
+            value["max_ms"] = round(value["max_ms"], 3)
+            result.append(value)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._by_fingerprint.clear()
+
+
+query_stats = QueryStats()
+
+
+def observe_query(query, started, rows=None, error=None):
+    """
+    Регистрирует выполненный запрос.
+    started — значение time.perf_counter() до выполнения
+    """
+    duration_ms = (time.perf_counter() - started) * 1000.0
+    key = fingerprint(query)
+    query_stats.record(key, duration_ms, rows, error is not None)
+
+    if error is not None:
+        logger.warning("query failed in %.1f ms: %s | %s", duration_ms, key, error)
+    elif duration_ms >= DB_SLOW_QUERY_MS:
+        logger.warning("slow query %.1f ms, rows=%s: %s", duration_ms, rows, key)
+    elif DB_QUERY_LOG_SAMPLE_RATE and random.random() < DB_QUERY_LOG_SAMPLE_RATE:
+        logger.info("query %.1f ms, rows=%s: %s", duration_ms, rows, key)
+    return duration_ms
+
+
+def get_query_stats(top=20):
+    """Топ запросов по суммарному времени"""
+    return {
+        "slow_query_ms": DB_SLOW_QUERY_MS,
+        "sample_rate": DB_QUERY_LOG_SAMPLE_RATE,
+        "queries": query_stats.snapshot(top),
+    }
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Чистый ASGI middleware: charset=utf-8 для JSON и сжатие ответов (br / gzip).
+
+В отличие от @app.middleware("http") (BaseHTTPMiddleware) не оборачивает
+ответ в отдельную задачу и поток: заголовки правятся прямо в сообщении
+http.response.start, тело проходит насквозь, стриминг сохраняется.
+"""
+
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from .http_cache import REPRESENTATION_ETAG_PREFIX
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - без brotli сжимаем только gzip
+    brotli = None
+
+# Тела меньше порога не сжимаются: выигрыш меньше накладных расходов
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+# Сжатые тела ответов контента (ETag — хэш тела, см. http_cache) переиспользуются:
+# (etag, encoding) -> bytes
+COMPRESS_CACHE_SIZE = int(os.getenv("COMPRESS_CACHE_SIZE", "256"))
+
+# Системные endpoints FastAPI не трогаем (как раньше add_charset_middleware)
+CHARSET_EXCLUDED_PATHS = ("/docs", "/redoc", "/openapi.json")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def _accepted_encoding(headers):
+    """br, gzip или None по Accept-Encoding (q=0 считается отказом)"""
+    accept = b""
+    for name, value in headers:
+        if name == b"accept-encoding":
+            accept = value.lower()
+            break
+    if not accept:
+        return None
+    accepted = set()
+    for part in accept.decode("latin-1").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        else:
+            # wbits=31: формат gzip
+            self._impl = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._impl.process(data)
+        return self._impl.compress(data)
+
+    def finish(self):
+        return self._impl.finish() if self.encoding == "br" else self._impl.flush()
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class _CompressedCache:
+    """LRU сжатых тел по (ETag, encoding): кэшированные ответы контента не сжимаются повторно"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_compressed_cache = _CompressedCache(COMPRESS_CACHE_SIZE)
+
+
+_REPRESENTATION_ETAG = REPRESENTATION_ETAG_PREFIX.encode()
+
+
+def _representation_etag(headers):
+    """ETag из make_representation (хэш тела) или None: только такие тела кэшируются сжатыми"""
+    for name, value in headers:
+        if name == b"etag":
+            return value if value.startswith(_REPRESENTATION_ETAG) else None
+    return None
+
+
+class CharsetCompressionMiddleware:
+    """
+    app.add_middleware(CharsetCompressionMiddleware)
+
+    - application/json без charset -> application/json; charset=utf-8
+    - сжатие br/gzip по Accept-Encoding для тел от COMPRESS_MIN_SIZE байт
+      (одним сообщением) и для потоковых ответов
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        set_charset = not path.startswith(CHARSET_EXCLUDED_PATHS)
+        encoding = None if scope.get("method") == "HEAD" else _accepted_encoding(scope["headers"])
+
+        start_message = None
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if set_charset:
+                    headers = _with_charset(headers)
+                compressible = _compressible(message["status"], headers)
+                if compressible:
+                    # Vary и для несжатого ответа: иначе прокси отдаст его всем клиентам
+                    headers = _with_vary(headers)
+                message["headers"] = headers
+                if encoding is None or not compressible:
+                    await send(message)
+                    return
+                # Решение о сжатии — по первому сообщению тела
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body:
+                    # Ответ целиком в одном сообщении (JSONResponse, Response)
+                    pending, start_message = start_message, None
+                    if len(body) < self.minimum_size:
+                        await send(pending)
+                        await send(message)
+                        return
+                    etag = _representation_etag(pending["headers"]) if COMPRESS_CACHE_SIZE else None
+                    compressed = _compressed_cache.get((etag, encoding)) if etag else None
+                    if compressed is None:
+                        compressed = compress_body(body, encoding)
+                        if etag:
+                            _compressed_cache.set((etag, encoding), compressed)
+                    body = compressed
+                    pending["headers"] = _compressed_headers(pending["headers"], encoding, len(body))
+                    await send(pending)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                compressor = _Compressor(encoding)
+                start_message["headers"] = _compressed_headers(start_message["headers"], encoding, None)
+                await send(start_message)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+                start_message = None
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _with_charset(headers):
+    result = []
+    for name, value in headers:
+        if name == b"content-type" and value.startswith(b"application/json") and b"charset" not in value:
+            value = b"application/json; charset=utf-8"
+        result.append((name, value))
+    return result
+
+
+def _compressible(status, headers):
+    # 206: сжатие диапазона ломает Range-запросы
+    if status < 200 or status in (204, 206, 304):
+        return False
+    content_type = b""
+    for name, value in headers:
+        if name in (b"content-encoding", b"content-range"):
+            # Уже сжато (например, файл .gz) или часть тела
+            return False
+        if name == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+
+def _with_vary(headers):
+    result = []
+    vary = None
+    for name, value in headers:
+        if name == b"vary":
+            vary = value
+            continue
+        result.append((name, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower():
+        vary += b", Accept-Encoding"
+    result.append((b"vary", vary))
+    return result
+
+
+def _compressed_headers(headers, encoding, length):
+    # Vary уже добавлен в send_wrapper
+    result = []
+    for name, value in headers:
+        if name == b"content-length":
+            continue
+        if name == b"etag" and not value.startswith(b"W/"):
+            # Сжатое тело побайтно отличается: сильный ETag становится слабым
+            value = b"W/" + value
+        result.append((name, value))
+    result.append((b"content-encoding", encoding.encode()))
+    if length is not None:
+        result.append((b"content-length", str(length).encode()))
+    return result
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Непрозрачные курсоры keyset пагинации.
+Курсор — base64url от JSON [created_at, id] последней строки страницы
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id); ValueError для поврежденного курсора"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
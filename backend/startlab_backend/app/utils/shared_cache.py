@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Общий для всех воркеров uvicorn кэш контента на одном хосте.
+
+Записи — файлы в tmpfs (/dev/shm), по каталогу на ресурс. В записи хранится
+поколение ресурса на момент построения: после инвалидации (в любом воркере)
+старые записи не читаются, даже если файл еще не удален. Перестройку ключа
+выполняет один процесс — остальные ждут на flock и читают готовый результат.
+
+Каталог должен принадлежать пользователю процесса и иметь права 0700,
+иначе кэш не запускается. Записи подписаны HMAC-SHA256 (ключ — файл secret
+в этом каталоге или CONTENT_CACHE_SECRET): pickle загружается только после
+проверки подписи, подложенный файл считается промахом.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import hmac
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from .cache import _MISSING
+
+
+CONTENT_CACHE_SECRET = os.getenv("CONTENT_CACHE_SECRET")
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+def default_cache_dir():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    # uid в имени: каталоги разных пользователей не пересекаются
+    return os.path.join(base, f"startlab-content-cache-{os.getuid()}")
+
+
+def _ensure_private_dir(path):
+    """Создает каталог 0700; чужой каталог или симлинк — ошибка запуска"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f"Каталог кэша {path} не принадлежит пользователю процесса (uid {os.getuid()})")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+
+def _load_secret(directory):
+    """Ключ подписи общий для воркеров: читается из файла или создается одним из них"""
+    if CONTENT_CACHE_SECRET:
+        return CONTENT_CACHE_SECRET.encode("utf-8")
+    path = os.path.join(directory, "secret")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+    # Другой воркер мог создать файл, но еще не дописать ключ
+    for _ in range(50):
+        with open(path, "rb") as f:
+            secret = f.read()
+        if len(secret) == 32:
+            return secret
+        time.sleep(0.01)
+    raise RuntimeError(f"Некорректный ключ подписи кэша {path}")
+
+
+class SharedFileCache:
+    """
+    Межпроцессный кэш с тем же интерфейсом, что у cache.TTLCache.
+    Время — time.time(), т.к. записи читают разные процессы
+    """
+
+    shared = True
+
+    def __init__(self, name, ttl, maxsize, stale_ttl=0, directory=None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.directory = directory or default_cache_dir()
+        _ensure_private_dir(self.directory)
+        self._secret = _load_secret(self.directory)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # --- пути и поколения ---
+
+    def _resource_dir(self, resource):
+        return os.path.join(self.directory, str(resource))
+
+    def _sign(self, data):
+        return hmac.new(self._secret, data, hashlib.sha256).digest()
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self._resource_dir(key[0]), digest)
+
+    def _read_counter(self, name):
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_counter(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                value = int(f.read() or 0) + 1
+            except ValueError:
+                value = 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(value).encode())
+            f.flush()
+
+    def generation(self, resource):
+        return self._read_counter("generation"), self._read_counter(f"generation-{resource}")
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    # --- чтение и запись ---
+
+    def lookup(self, key):
+        """(value, fresh) как у TTLCache.lookup; value — _MISSING при промахе"""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._count("misses")
+            return _MISSING, False
+        signature, body = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+        try:
+            if not hmac.compare_digest(signature, self._sign(body)):
+                raise ValueError("неверная подпись")
+            expires_at, generation, value = pickle.loads(body)
+        except Exception:
+            # Поврежденная, недописанная или чужая запись — считаем промахом
+            self._remove_entry(path)
+            self._count("misses")
+            return _MISSING, False
+
+        now = time.time()
+        if generation != self.generation(key[0]) or expires_at + self.stale_ttl <= now:
+            self._remove_entry(path)
+            self._count("misses")
+            return _MISSING, False
+        if expires_at <= now:
+            self._count("stale_hits")
+            return value, False
+        self._count("hits")
+        return value, True
+
+    def get(self, key, default=None):
+        value, fresh = self.lookup(key)
+        return value if fresh else default
+
+    def set(self, key, value, ttl=None, generation=None):
+        current = self.generation(key[0])
+        if generation is not None and generation != current:
+            return
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        directory = self._resource_dir(key[0])
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        body = pickle.dumps((expires_at, current, value), protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._sign(body))
+                f.write(body)
+            # Атомарная замена: читатели видят либо старую, либо новую запись целиком
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        self._evict(directory)
+
+    @staticmethod
+    def _entries(directory):
+        try:
+            return [
+                entry for entry in os.scandir(directory)
+                if not entry.name.startswith(".") and not entry.name.endswith(".lock")
+            ]
+        except OSError:
+            return []
+
+    def _evict(self, directory):
+        """Ограничение числа записей ресурса: удаляются самые старые по mtime"""
+        entries = self._entries(directory)
+        if len(entries) <= self.maxsize:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.maxsize]:
+            self._remove_entry(entry.path)
+            self._count("evictions")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _remove_entry(self, path):
+        """Запись удаляется вместе с ее .lock: иначе каждый новый ключ оставлял бы файл в tmpfs"""
+        self._remove(path)
+        self._remove(path + ".lock")
+
+    # --- межпроцессная блокировка перестройки ---
+
+    @asynccontextmanager
+    async def build_lock(self, key):
+        """Эксклюзивная блокировка ключа между процессами (flock, ожидание в потоке)"""
+        os.makedirs(self._resource_dir(key[0]), mode=0o700, exist_ok=True)
+        lock_path = self._entry_path(key) + ".lock"
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                # Пока ждали, файл могли удалить вместе с записью: блокировка
+                # старого inode уже никого не исключает — берем новый файл
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+        try:
+            yield
+        finally:
+            # Закрытие дескриптора снимает flock
+            os.close(fd)
+
+    # --- инвалидация ---
+
+    def invalidate(self, key):
+        path = self._entry_path(key)
+        if os.path.exists(path):
+            self._remove_entry(path)
+            self._count("invalidations")
+
+    def invalidate_resource(self, resource):
+        """Новое поколение ресурса во всех воркерах сразу; файлы удаляются следом"""
+        self._bump_counter(f"generation-{resource}")
+        for entry in self._entries(self._resource_dir(resource)):
+            self._remove_entry(entry.path)
+            self._count("invalidations")
+
+    def clear(self):
+        self._bump_counter("generation")
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+                self._count("invalidations")
+
+    def stats(self):
+        size = sum(
+            len(self._entries(entry.path)) for entry in os.scandir(self.directory) if entry.is_dir()
+        )
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "name": self.name,
+            "backend": "shared",
+            "directory": self.directory,
+            "pid": os.getpid(),
+            "ttl": self.ttl,
+            "maxsize": self.maxsize,
+            "stale_ttl": self.stale_ttl,
+            "size": size,
+            "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            **stats,
+        }
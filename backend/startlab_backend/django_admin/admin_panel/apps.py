@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AdminPanelConfig(AppConfig):
+    """Приложение админки СТАРТЛАБ"""
+    name = 'admin_panel'
+    verbose_name = 'СТАРТЛАБ'
+
+    def ready(self):
+        # Подключаем сигналы, уведомляющие API об изменениях контента
+        from . import signals  # noqa: F401
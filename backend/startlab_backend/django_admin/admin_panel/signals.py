@@ -0,0 +1,102 @@
+"""
+Уведомления API об изменениях контента.
+
+После сохранения/удаления партнера, FAQ, новости или формы (заявки, вопросов) админка отправляет
+NOTIFY в канал CONTENT_NOTIFY_CHANNEL; каждый воркер FastAPI слушает этот канал
+и сбрасывает соответствующие записи своего кэша.
+
+Если задан CONTENT_PURGE_URL (purge-сервер nginx, см. nginx_conf.txt), туда же
+отправляются запросы PURGE по префиксу адресов ресурса: ключ кэша nginx — $request_uri,
+поэтому префикс /api/news сбрасывает и список, и /news/{id}, и все варианты
+с параметрами (?fields=, ?ids=, ?cursor=, /search?q=).
+"""
+
+import json
+import os
+import threading
+import urllib.request
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Partner, FAQ, News, Submission, Form, SubmissionQuestion, FormQuestion
+
+CONTENT_NOTIFY_CHANNEL = os.getenv('CONTENT_NOTIFY_CHANNEL', 'content_changed')
+# Например http://192.168.0.10:8089 — без завершающего слэша
+CONTENT_PURGE_URL = os.getenv('CONTENT_PURGE_URL', '').rstrip('/')
+CONTENT_PURGE_TIMEOUT = float(os.getenv('CONTENT_PURGE_TIMEOUT', '2'))
+
+RESOURCE_BY_MODEL = {
+    Partner: 'partners',
+    FAQ: 'faqs',
+    News: 'news',
+    # Реестр форм API (app/form_registry.py)
+    Submission: 'forms',
+    Form: 'forms',
+    SubmissionQuestion: 'forms',
+    FormQuestion: 'forms',
+}
+
+# Публичный префикс адресов ресурса в кэше nginx (ключ — $request_uri)
+PURGE_PREFIXES = {
+    'partners': '/api/partners',
+    'faqs': '/api/faqs',
+    'news': '/api/news',
+}
+
+
+def purge_proxy_cache(resource, object_id=None):
+    """PURGE закэшированных прокси ответов ресурса (в фоне, чтобы не задерживать админку)"""
+    # Формы не отдаются через кэширующий прокси
+    if not CONTENT_PURGE_URL or resource not in PURGE_PREFIXES:
+        return
+
+    # Префикс покрывает объект и все варианты с параметрами; /home собирается из всех трех ресурсов
+    paths = [PURGE_PREFIXES[resource], '/api/home']
+
+    def send():
+        for path in paths:
+            request = urllib.request.Request(CONTENT_PURGE_URL + path, method='PURGE')
+            try:
+                urllib.request.urlopen(request, timeout=CONTENT_PURGE_TIMEOUT).close()
+            except Exception as e:
+                # 404 от ngx_cache_purge — в кэше не было ответа, это не ошибка
+                if getattr(e, 'code', None) != 404:
+                    print(f"⚠️ Не удалось сбросить кэш прокси {path}: {e}")
+
+    threading.Thread(target=send, daemon=True).start()
+
+
+def notify_content_changed(resource, object_id=None, action='save'):
+    """Отправляет NOTIFY после коммита текущей транзакции"""
+    payload = json.dumps({'resource': resource, 'id': object_id, 'action': action})
+
+    def send():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CONTENT_NOTIFY_CHANNEL, payload])
+
+    transaction.on_commit(send)
+    transaction.on_commit(lambda: purge_proxy_cache(resource, object_id))
+
+
+@receiver(post_save, sender=Partner)
+@receiver(post_save, sender=FAQ)
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Submission)
+@receiver(post_save, sender=Form)
+@receiver(post_save, sender=SubmissionQuestion)
+@receiver(post_save, sender=FormQuestion)
+def content_saved(sender, instance, **kwargs):
+    notify_content_changed(RESOURCE_BY_MODEL[sender], instance.pk, 'save')
+
+
+@receiver(post_delete, sender=Partner)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Submission)
+@receiver(post_delete, sender=Form)
+@receiver(post_delete, sender=SubmissionQuestion)
+@receiver(post_delete, sender=FormQuestion)
+def content_deleted(sender, instance, **kwargs):
+    notify_content_changed(RESOURCE_BY_MODEL[sender], instance.pk, 'delete')
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи заявки: прежняя последовательность команд в транзакции
+(INSERT заявки, SAVEPOINT + INSERT команды, RELEASE, INSERT руководителя)
+против конвейера app.intake (одна команда с CTE и ключом идемпотентности).
+
+Нужна настроенная БД (.env как у API). Строки пишутся в рабочие таблицы
+с sha256 "bench-..." и удаляются в конце.
+
+    python scripts/bench_intake.py [--submissions 200] [--team 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# Добавляем путь к корневой директории проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.async_database import (
+    init_async_pool, close_async_pool, execute_query, transaction, savepoint, bulk_insert,
+)
+from app.intake import TEAM_COLUMNS, normalize, write_application
+
+
+def sample_payload(team_size):
+    return {
+        "type": "science",
+        "title": "Умная теплица", "relevance": "Актуально", "goal": "Цель", "tasks": "Задачи",
+        "description": "Описание проекта " * 20, "expectedResults": "Результаты",
+        "marketAssessment": "Рынок", "competitionAnalysis": "Конкуренты", "budgetBYN": "1000",
+        "timeline": "6 месяцев",
+        "team": [
+            {"fullName": f"Иванов Иван {i}", "faculty": "ФКСиС", "group": "123456",
+             "phone": "+375291234567", "email": f"student{i}@example.com", "keySkills": "Python", "role": "Разработчик"}
+            for i in range(team_size)
+        ],
+        "supervisor": {"fullName": "Петров Петр Петрович", "academicTitle": "к.т.н.", "position": "доцент"},
+        "attachments": [{"label": "Нет", "url": ""}],
+        "additionalInfo": "",
+    }
+
+
+async def legacy_write(application, sha256):
+    """Прежний /intake: отдельные команды в одной транзакции"""
+    async with transaction() as conn:
+        await bulk_insert(
+            "answers",
+            ("title", "relevance", "goal", "tasks", "description", "expectedResults", "marketAssessment",
+             "competitionAnalysis", "budgetBYN", "timeline", "label", "url", "additionalInfo", "sha256"),
+            [application["application"] + (sha256,)],
+            connection=conn,
+        )
+        async with savepoint(conn):
+            await bulk_insert("team", TEAM_COLUMNS, [m + (sha256,) for m in application["team"]], connection=conn)
+        await bulk_insert(
+            "supervisor_2", ("fullName", "academicTitle", "position", "phone", "email", "sha256"),
+            [application["supervisor"] + (sha256,)], connection=conn,
+        )
+
+
+async def measure(write, application, submissions, prefix):
+    timings = []
+    for i in range(submissions):
+        sha256 = f"{prefix}-{i}"
+        started = time.perf_counter()
+        await write(application, sha256)
+        timings.append((time.perf_counter() - started) * 1e3)
+    return timings
+
+
+async def main(submissions, team_size):
+    await init_async_pool()
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        application = normalize(sample_payload(team_size), "science")
+        print(f"Заявок: {submissions}, участников в команде: {team_size}")
+        # Уникальный ключ на каждую заявку: измеряется запись, а не подавление повторов
+        pipeline_write = lambda application, sha256: write_application(application, sha256, sha256)
+        for name, write in (("прежний код", legacy_write), ("конвейер", pipeline_write)):
+            # Прогрев соединений пула
+            await measure(write, application, 5, f"bench-{run_id}-warm")
+            timings = await measure(write, application, submissions, f"bench-{run_id}-{name}")
+            timings.sort()
+            print(
+                f"  {name:<12} среднее {statistics.mean(timings):6.2f} мс   "
+                f"p50 {timings[len(timings) // 2]:6.2f} мс   p95 {timings[int(len(timings) * 0.95)]:6.2f} мс"
+            )
+    finally:
+        for table in ("answers", "team", "supervisor_2", "intake_requests"):
+            await execute_query(
+                f'DELETE FROM {table} WHERE "sha256" LIKE %s', (f"bench-{run_id}-%",), fetch=False
+            )
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--team", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.submissions, args.team))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов middleware на запрос:
+старый add_charset_middleware (BaseHTTPMiddleware) против CharsetCompressionMiddleware.
+
+Приложение вызывается напрямую через ASGI (без сети и HTTP клиента), поэтому
+разница во времени — это стоимость самих middleware.
+
+    python scripts/bench_middleware.py [--requests 5000] [--items 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем путь к корневой директории проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Response
+
+from app.utils import middleware
+from app.utils.middleware import CharsetCompressionMiddleware
+from app.utils.http_cache import encode_json
+
+
+def legacy_app(body):
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def add_charset_middleware(request, call_next):
+        response = await call_next(request)
+        if not request.url.path.startswith(('/docs', '/redoc', '/openapi.json')):
+            if "application/json" in response.headers.get("content-type", ""):
+                response.headers["Content-Type"] = "application/json; charset=utf-8"
+        return response
+
+    _add_route(app, body)
+    return app
+
+
+def asgi_app(body):
+    app = FastAPI()
+    app.add_middleware(CharsetCompressionMiddleware)
+    _add_route(app, body)
+    return app
+
+
+def bare_app(body):
+    app = FastAPI()
+    _add_route(app, body)
+    return app
+
+
+def _add_route(app, body):
+    # ETag как у контентных эндпоинтов: сжатое тело берется из кэша middleware
+    @app.get("/news/")
+    async def news():
+        return Response(content=body, media_type="application/json", headers={"ETag": '"bench"'})
+
+    @app.get("/news/dynamic")
+    async def news_dynamic():
+        return Response(content=body, media_type="application/json")
+
+
+def sample_body(items):
+    news = [
+        {
+            "id": i,
+            "title": f"Новость {i}",
+            "content": "<p>Текст новости о конкурсе стартапов.</p>" * 10,
+            "image": f"news/{i}.jpg",
+            "imageUrl": f"http://bsuir.stacklevel.group/media/news/{i}.jpg",
+            "is_active": True,
+            "created_at": "2025-01-01T12:00:00",
+            "updated_at": None,
+        }
+        for i in range(items)
+    ]
+    return encode_json(news)
+
+
+async def run(app, requests, accept_encoding, path="/news/"):
+    headers = [(b"host", b"bench")]
+    if accept_encoding:
+        headers.append((b"accept-encoding", accept_encoding))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    sent = {"bytes": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent["bytes"] += len(message.get("body", b""))
+
+    # Прогрев
+    for _ in range(min(200, requests)):
+        await app(dict(scope), receive, send)
+    sent["bytes"] = 0
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e6, sent["bytes"] // requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=50, help="число новостей в теле ответа")
+    args = parser.parse_args()
+
+    body = sample_body(args.items)
+    print(f"Тело ответа: {len(body)} байт, запросов: {args.requests}")
+    cases = [
+        ("без middleware", bare_app(body), None, "/news/"),
+        ("BaseHTTPMiddleware (старый)", legacy_app(body), None, "/news/"),
+        ("ASGI, без сжатия", asgi_app(body), None, "/news/"),
+        ("ASGI, gzip, без ETag", asgi_app(body), b"gzip", "/news/dynamic"),
+        ("ASGI, gzip, ETag (кэш)", asgi_app(body), b"gzip", "/news/"),
+    ]
+    if middleware.brotli is not None:
+        cases.append(("ASGI, br, ETag (кэш)", asgi_app(body), b"br", "/news/"))
+    else:
+        print("  (brotli не установлен — br пропущен)")
+    for name, app, accept_encoding, path in cases:
+        per_request_us, sent_bytes = asyncio.run(run(app, args.requests, accept_encoding, path))
+        print(f"  {name:<30} {per_request_us:9.1f} мкс/запрос   {sent_bytes:>8} байт")
+
+
+if __name__ == "__main__":
+    main()
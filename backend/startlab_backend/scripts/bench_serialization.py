@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк построения и сериализации ответов на 1000 строк:
+прежние словари (правка в цикле, MEDIA_BASE_URL из окружения на строку),
+pydantic объект на строку, dataclass со __slots__ и конвертеры schemas.rows.
+
+Строки генерируются в памяти, БД не нужна.
+
+    python scripts/bench_serialization.py [--rows 1000] [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Добавляем путь к корневой директории проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+
+from app.schemas.rows import media_url, news_rows, faq_rows, partner_rows
+from app.schemas.schemas import Partner
+from app.utils.http_cache import encode_json
+
+
+def legacy_image_url(image_path):
+    if not image_path:
+        return None
+    if image_path.startswith('http'):
+        return image_path
+    base_url = os.getenv("MEDIA_BASE_URL", "http://bsuir.stacklevel.group/media/")
+    return f"{base_url}{image_path}"
+
+
+def legacy_news(rows):
+    for item in rows:
+        if item.get('image'):
+            item['imageUrl'] = legacy_image_url(item['image'])
+        else:
+            item['imageUrl'] = None
+    return rows
+
+
+def legacy_faqs(rows):
+    return legacy_news(rows)
+
+
+def legacy_partners(rows):
+    for row in rows:
+        if row.get('logo'):
+            row['logo_url'] = f"/media/{row['logo']}"
+    return [
+        {
+            'name': row['name'],
+            'title': row.get('title'),
+            'description': row.get('description'),
+            'website': row.get('website'),
+            'is_active': row.get('is_active', True),
+            'id': row['id'],
+            'logoUrl': row.get('logo_url'),
+            'created_at': row.get('created_at'),
+        }
+        for row in rows
+    ]
+
+
+class NewsModel(BaseModel):
+    id: int
+    title: str
+    content: str
+    image: Optional[str] = None
+    is_active: bool = True
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    imageUrl: Optional[str] = None
+
+
+class FAQModel(BaseModel):
+    id: int
+    question: str
+    answer: str
+    order: int
+    is_active: bool = True
+    image: Optional[str] = None
+    created_at: Optional[datetime] = None
+    imageUrl: Optional[str] = None
+
+
+@dataclass(slots=True)
+class NewsSlots:
+    id: int
+    title: str
+    content: str
+    image: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    imageUrl: Optional[str]
+
+
+@dataclass(slots=True)
+class FAQSlots:
+    id: int
+    question: str
+    answer: str
+    order: int
+    is_active: bool
+    image: Optional[str]
+    created_at: Optional[datetime]
+    imageUrl: Optional[str]
+
+
+@dataclass(slots=True)
+class PartnerSlots:
+    name: str
+    title: Optional[str]
+    description: Optional[str]
+    website: Optional[str]
+    is_active: bool
+    id: int
+    logoUrl: Optional[str]
+    created_at: Optional[datetime]
+
+
+def slots_news(rows):
+    return [
+        NewsSlots(row["id"], row["title"], row["content"], row["image"], row["is_active"],
+                  row["created_at"], row["updated_at"], media_url(row["image"]))
+        for row in rows
+    ]
+
+
+def slots_faqs(rows):
+    return [
+        FAQSlots(row["id"], row["question"], row["answer"], row["order"], row["is_active"],
+                 row["image"], row["created_at"], media_url(row["image"]))
+        for row in rows
+    ]
+
+
+def slots_partners(rows):
+    return [
+        PartnerSlots(row["name"], row["title"], row["description"], row["website"], row["is_active"],
+                     row["id"], f"/media/{row['logo']}" if row["logo"] else None, row["created_at"])
+        for row in rows
+    ]
+
+
+def pydantic_news(rows):
+    return [NewsModel(**row, imageUrl=legacy_image_url(row['image'])).model_dump() for row in rows]
+
+
+def pydantic_faqs(rows):
+    return [FAQModel(**row, imageUrl=legacy_image_url(row['image'])).model_dump() for row in rows]
+
+
+def pydantic_partners(rows):
+    return [
+        Partner(**row, logoUrl=f"/media/{row['logo']}" if row['logo'] else None).model_dump()
+        for row in rows
+    ]
+
+
+def sample_rows(count):
+    started = datetime(2025, 1, 1, 12)
+    news = [
+        {
+            "id": i, "title": f"Новость {i}",
+            "content": "<p>Текст новости о конкурсе стартапов.</p>" * 5,
+            "image": f"news/{i}.jpg" if i % 4 else None, "is_active": True,
+            "created_at": started + timedelta(hours=i), "updated_at": None,
+        }
+        for i in range(count)
+    ]
+    faqs = [
+        {
+            "id": i, "question": f"Вопрос {i}?", "answer": "Ответ на вопрос. " * 5, "order": i,
+            "is_active": True, "image": f"faqs/{i}.png" if i % 2 else None,
+            "created_at": started + timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+    partners = [
+        {
+            "id": i, "name": f"Партнер {i}", "title": "Компания", "logo": f"partners/{i}.png",
+            "description": "Описание партнера", "website": "https://example.com",
+            "is_active": True, "created_at": started + timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+    return {"news": news, "faqs": faqs, "partners": partners}
+
+
+def measure(convert, rows, repeat):
+    # Прежний код правил строки на месте, поэтому каждый проход получает свои копии
+    copies = [[dict(row) for row in rows] for _ in range(repeat)]
+    started = time.perf_counter()
+    for batch in copies:
+        encode_json(convert(batch))
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    data = sample_rows(args.rows)
+    variants = {
+        "news": (legacy_news, pydantic_news, slots_news, news_rows),
+        "faqs": (legacy_faqs, pydantic_faqs, slots_faqs, faq_rows),
+        "partners": (legacy_partners, pydantic_partners, slots_partners, partner_rows),
+    }
+    scale = 1000 / args.rows
+    print(f"Строк: {args.rows}, повторов: {args.repeat}; время на 1000 строк (построение + JSON)")
+    for resource, (legacy, pydantic_convert, slots_convert, rows_convert) in variants.items():
+        rows = data[resource]
+        results = [
+            ("словари", measure(legacy, rows, args.repeat)),
+            ("pydantic", measure(pydantic_convert, rows, args.repeat)),
+            ("slots", measure(slots_convert, rows, args.repeat)),
+            ("schemas.rows", measure(rows_convert, rows, args.repeat)),
+        ]
+        for name, seconds in results:
+            print(f"  {resource:<9} {name:<13} {seconds * scale * 1e3:8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
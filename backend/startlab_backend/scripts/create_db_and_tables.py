@@ -284,15 +284,87 @@ def create_tables(host: str, port: int, dbname: str, user: str, password: str) -
                 """
             )
 
+            # Idempotency ledger of /app/intake*: one row per accepted submission.
+            # The primary key makes retries (same Idempotency-Key or same content) no-ops
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS intake_requests (
+                    "key" VARCHAR(64) PRIMARY KEY,
+                    "kind" VARCHAR(16) NOT NULL,
+                    "sha256" VARCHAR(64) NOT NULL,
+                    "content_sha256" VARCHAR(64),
+                    "created_at" TIMESTAMP NOT NULL DEFAULT NOW()
+                );
+                """
+            )
+            # Content hash of the first submission: a replayed key with other content is rejected (409)
+            cur.execute('ALTER TABLE intake_requests ADD COLUMN IF NOT EXISTS "content_sha256" VARCHAR(64)')
+            # /app/intake-status/{sha256} looks submissions up by group hash
+            cur.execute('CREATE INDEX IF NOT EXISTS ix_intake_requests_sha256 ON intake_requests("sha256")')
+
             # Helpful indexes
             cur.execute('CREATE INDEX IF NOT EXISTS ix_faqs_order ON faqs("order")')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_partners_active ON partners(is_active)')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_news_created_at ON news(created_at)')
+            # Keyset pagination of /news/: ORDER BY created_at DESC, id DESC over active rows
+            cur.execute('CREATE INDEX IF NOT EXISTS ix_news_active_created_id ON news(created_at DESC, id DESC) WHERE is_active = true')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_forms_submission ON forms(submission_id)')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_submission_questions_submission ON submission_questions(submission_id)')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_form_questions_form ON form_questions(form_id)')
             cur.execute('CREATE INDEX IF NOT EXISTS ix_form_answers_form_question ON form_answers(form_question_id)')
 
+            # Full-text search (Russian) for /news/search and /faqs/search.
+            # search_vector is maintained by triggers, so admin saves need no extra code
+            cur.execute(
+                """
+                CREATE OR REPLACE FUNCTION strip_html(value TEXT) RETURNS TEXT AS $$
+                    -- Summernote HTML -> plain text: tags and entities become spaces
+                    SELECT regexp_replace(
+                        regexp_replace(coalesce(value, ''), '<[^>]*>', ' ', 'g'),
+                        '&[A-Za-z0-9#]+;', ' ', 'g'
+                    )
+                $$ LANGUAGE sql IMMUTABLE;
+                """
+            )
+            cur.execute(
+                """
+                CREATE OR REPLACE FUNCTION news_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+                        setweight(to_tsvector('russian', strip_html(NEW.content)), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+                """
+            )
+            cur.execute(
+                """
+                CREATE OR REPLACE FUNCTION faqs_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('russian', coalesce(NEW.question, '')), 'A') ||
+                        setweight(to_tsvector('russian', strip_html(NEW.answer)), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+                """
+            )
+            for table, columns in (("news", "title, content"), ("faqs", "question, answer")):
+                cur.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector')
+                cur.execute(f'DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}')
+                cur.execute(
+                    f"""
+                    CREATE TRIGGER {table}_search_vector_trigger
+                        BEFORE INSERT OR UPDATE OF {columns} ON {table}
+                        FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+                    """
+                )
+                # Backfill rows created before the trigger existed (no-op on later runs)
+                first_column = columns.split(",")[0]
+                cur.execute(f'UPDATE {table} SET {first_column} = {first_column} WHERE search_vector IS NULL')
+                cur.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)')
+
         conn.commit()
         print("✅ Tables ensured successfully")
     finally: